@@ -1,4 +1,4 @@
-from managers.config_manager import ConfigManager
+from managers.config_manager import ConfigManager, SERVICE_NAME_PATTERN
 from flask import Flask, render_template, request, redirect, url_for, flash, Response, stream_with_context, jsonify
 import os
 from dotenv import load_dotenv
@@ -7,7 +7,18 @@ from managers.docker_manager import DockerManager
 from managers.ansible_manager import AnsibleManager
 from managers.doctl_registry_manager import RegistryManager
 from managers.caddy_manager import CaddyManager
+from managers.scheduler_manager import SchedulerManager
+from managers.autoscale_manager import AutoscaleManager
+from managers.access_log_manager import AccessLogManager
+from managers.prefetch_manager import PrefetchManager
+from managers.auto_deploy_manager import AutoDeployManager
+from managers.footprint_manager import FootprintManager
+from managers.stats_history_manager import StatsHistoryManager
+from managers.probe_manager import ProbeManager
+from managers.deployment_lock import DeploymentLock
+import hmac
 import json
+import re
 import docker
 from pathlib import Path
 
@@ -16,9 +27,40 @@ load_dotenv()
 
 # Initialize managers
 docker_manager = DockerManager()
-ansible_manager = AnsibleManager()
+ansible_manager = AnsibleManager(docker_manager)
 registry_manager = RegistryManager()
 caddy_manager = CaddyManager()
+scheduler_manager = SchedulerManager()
+access_log_manager = AccessLogManager()
+
+# Also held by deploy_cli.py runs
+deployment_lock = DeploymentLock()
+
+def deploy_services_in_background(*service_names: str) -> None:
+    """Run deploy.yml for the given services to completion, printing the output
+
+    Raises an exception when the deployment fails.
+    """
+    services = [s for s in registry_manager.list_images() if s['name'] in service_names]
+    if not services:
+        raise Exception(f"Services not found in registry: {', '.join(service_names)}")
+
+    deployment = _run_deployment('deploy.yml', services)
+    while True:
+        try:
+            print(next(deployment).removeprefix('data: ').rstrip())
+        except StopIteration as stop:
+            success = stop.value
+            break
+    if not success:
+        raise Exception(f"Deployment of {', '.join(service_names)} failed")
+
+autoscale_manager = AutoscaleManager(docker_manager, deploy_services_in_background)
+prefetch_manager = PrefetchManager(docker_manager, registry_manager)
+auto_deploy_manager = AutoDeployManager(docker_manager, registry_manager, deploy_services_in_background)
+footprint_manager = FootprintManager(docker_manager)
+stats_history_manager = StatsHistoryManager(docker_manager)
+probe_manager = ProbeManager(docker_manager, ansible_manager)
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24)
@@ -31,21 +73,35 @@ def dashboard():
     error_message = None
     
     if not docker_available:
-        error_message = "Docker is not available. Please check server setup and configuration."
+        ingress_health = docker_manager.get_health().get(ConfigManager().get_ingress_node()['name'], {})
+        if ingress_health.get('state', 'connecting') == 'connecting':
+            error_message = "Connecting to Docker... Reload the page in a moment."
+        else:
+            error_message = (f"Docker is not available: {ingress_health.get('error')}. "
+                             f"Retrying at {ingress_health.get('next_attempt_at')}.")
     else:
         try:
             services = registry_manager.list_images()
-            containers = docker_manager.client.containers.list(all=True)
+            containers = docker_manager.list_containers()
+            services_config = ConfigManager().get_services_config()
+            prefetch_states = prefetch_manager.get_states()
+            probe_summaries = probe_manager.get_summaries()
             matched_containers = set()
             
             for service in services:
-                container = next((c for c in containers if c.name == service['name']), None)
+                node_name, container = next(((n, c) for n, c in containers if c.name == service['name']), (None, None))
+                replica_pattern = re.compile(rf"^{re.escape(service['name'])}-replica-\d+$")
+                replica_containers = [c for _, c in containers if replica_pattern.match(c.name)]
+                matched_containers.update(c.id for c in replica_containers)
+                service['replicas'] = services_config.get(service['name'], {}).get('replicas', 1)
+                service['replicas_running'] = sum(c.status == 'running' for c in replica_containers)
                 if container:
                     matched_containers.add(container.id)
+                    service['replicas_running'] += container.status == 'running'
                     
                     # Check for image mismatch
                     try:    
-                        latest_image = docker_manager.client.images.get(service['image'])
+                        latest_image = docker_manager.clients[node_name].images.get(service['image'])
                         image_mismatch = container.image.id != latest_image.id
                     except docker.errors.ImageNotFound:
                         image_mismatch = True  # Image not found, consider it a mismatch
@@ -55,21 +111,28 @@ def dashboard():
                         'running': container.status == 'running',
                         'logs': container.logs(tail=5).decode('utf-8').split('\n'),
                         'deployed': True,
-                        'image_mismatch': image_mismatch
+                        'image_mismatch': image_mismatch,
+                        'node': node_name
                     })
+                    service['probe'] = probe_summaries.get(service['name'])
+                    prefetch = prefetch_states.get(service['name'], {})
+                    if prefetch.get('digest') == service.get('digest'):
+                        service['prefetch'] = prefetch.get('state')
                 else:
                     service.update({
                         'status': 'not deployed',
                         'running': False,
                         'logs': [],
                         'deployed': False,
-                        'image_mismatch': False
+                        'image_mismatch': False,
+                        'node': None
                     })
                     
-            for container in containers:
+            for node_name, container in containers:
                 if container.id not in matched_containers:
                     orphaned_containers.append({
                         'name': container.name,
+                        'node': node_name,
                         'image': container.image.tags[0] if container.image.tags else 'unknown',
                         'status': container.status,
                         'running': container.status == 'running',
@@ -86,16 +149,25 @@ def dashboard():
                          orphaned_containers=orphaned_containers,
                          docker_available=docker_available,
                          error_message=error_message,
-                         base_domain=base_domain)
+                         base_domain=base_domain,
+                         nodes=scheduler_manager.get_node_summary())
+
+def _run_deployment(playbooks: str | list[str], services: Optional[List[Dict]] = None,
+                    extra_vars: Optional[str] = None) -> Generator[str, None, bool]:
+    """Run playbooks while holding deployment_lock, yielding output and returning whether they succeeded
 
-def _stream_deployment(playbooks: str | list[str], extra_vars: Optional[str] = None) -> Generator[str, None, None]:
-    """Generic deployment streaming function
-    
     Args:
         playbooks: Either a single playbook string or list of playbook strings
+        services: Services to write to the vars file before running
         extra_vars: Extra vars to apply to all playbooks
     """
+    if not deployment_lock.acquire(blocking=False):
+        yield "data: Waiting for another deployment to finish...\n\n"
+        deployment_lock.acquire()
+
     try:
+        if services is not None:
+            ansible_manager.prepare_services_vars(services, write_to_file=True)
         cleanup_files = ansible_manager.setup_deployment()
 
         try:
@@ -103,17 +175,30 @@ def _stream_deployment(playbooks: str | list[str], extra_vars: Optional[str] = N
                 yield f"data: Starting deployment with {playbooks}...\n\n"
             else:
                 yield f"data: Starting deployment with playbooks: {', '.join(playbooks)}...\n\n"
-                
-            for output in ansible_manager.run_playbook(playbooks, extra_vars):
-                yield output
-                
-            yield "Process completed"
-                
+
+            return (yield from ansible_manager.run_playbook(playbooks, extra_vars))
+
         finally:
             for file in cleanup_files:
                 if os.path.exists(file):
                     os.remove(file)
-                    
+    finally:
+        deployment_lock.release()
+
+def _stream_deployment(playbooks: str | list[str], services: Optional[List[Dict]] = None,
+                       extra_vars: Optional[str] = None) -> Generator[str, None, None]:
+    """Generic deployment streaming function
+    
+    Args:
+        playbooks: Either a single playbook string or list of playbook strings
+        services: Services to write to the vars file before running
+        extra_vars: Extra vars to apply to all playbooks
+    """
+    try:
+        success = yield from _run_deployment(playbooks, services, extra_vars)
+        if not success:
+            yield "data: Error: Deployment failed\n\n"
+        yield "Process completed"
     except Exception as e:
         yield f"data: Error: {str(e)}\n\n"
 
@@ -148,20 +233,16 @@ def delete_container(name):
 @app.route('/deploy-machine-services')
 def deploy_machine_services():
     """Stream the output of deploying machine services"""
-    ansible_manager.prepare_services_vars(registry_manager.list_images(), write_to_file=True)
-
     return Response(
-        stream_with_context(_stream_deployment(['playbook.yml', 'deploy.yml'])),
+        stream_with_context(_stream_deployment(['playbook.yml', 'deploy.yml'], registry_manager.list_images())),
         mimetype='text/event-stream'
     )
 
 @app.route('/deploy-all-containers')
 def deploy_all_containers():
     """Stream the output of deploying all API services using deploy.yml"""
-    ansible_manager.prepare_services_vars(registry_manager.list_images(), write_to_file=True)
-        
     return Response(
-        stream_with_context(_stream_deployment('deploy.yml')),
+        stream_with_context(_stream_deployment('deploy.yml', registry_manager.list_images())),
         mimetype='text/event-stream'
     )
 
@@ -178,10 +259,8 @@ def deploy_container():
         return Response("data: Error: Service not found in registry\n\n", mimetype='text/event-stream')
         
     # Use the full service configuration instead of creating a simplified one
-    ansible_manager.prepare_services_vars([service], write_to_file=True)
-    
     return Response(
-        stream_with_context(_stream_deployment('deploy.yml')),
+        stream_with_context(_stream_deployment('deploy.yml', [service])),
         mimetype='text/event-stream'
     )
 
@@ -189,10 +268,137 @@ def deploy_container():
 def container_stats(name):
     try:
         stats = docker_manager.get_container_stats(name)
+        scheduler_manager.record_usage(name, stats['cpu_percent'], stats['memory_usage'])
+        stats_history_manager.record(name, stats['cpu_percent'], stats['memory_usage'])
         return jsonify(stats)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/stats-history/<name>')
+def stats_history(name):
+    """CPU and memory history of a service's containers"""
+    window = request.args.get('window', 3600, type=int)
+    if window < 1:
+        return jsonify({'error': 'window must be at least 1 second'}), 400
+    try:
+        return jsonify(stats_history_manager.get_history(name, window))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/health')
+def health():
+    """Docker connection state of every node"""
+    docker_manager.start()
+    nodes = docker_manager.get_health()
+    healthy = bool(nodes) and all(node['state'] == 'connected' for node in nodes.values())
+    return jsonify({'healthy': healthy, 'nodes': nodes}), 200 if healthy else 503
+
+@app.route('/nodes')
+def nodes():
+    """Capacity and placed services of every node"""
+    try:
+        return jsonify(scheduler_manager.get_node_summary())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/autoscaler')
+def autoscaler_status():
+    """Autoscaling settings, recent CPU and scaling events"""
+    try:
+        return jsonify(autoscale_manager.get_status())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/prefetch')
+def prefetch_status():
+    """Image prefetch state per service"""
+    try:
+        return jsonify({
+            'enabled': ConfigManager().get_prefetch_config().get('enabled', False),
+            'services': prefetch_manager.get_states()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/webhook/deploy', methods=['POST'])
+def deploy_webhook():
+    """Queue a deploy after an image push, authenticated with auto_deploy.webhook_secret"""
+    secret = ConfigManager().get_auto_deploy_config().get('webhook_secret')
+    # The placeholder from older example configs is public, never accept it
+    if not isinstance(secret, str) or not secret or secret == 'change-me':
+        return jsonify({'error': 'Webhook is not configured'}), 404
+
+    token = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not hmac.compare_digest(token.encode(), secret.encode()):
+        return jsonify({'error': 'Invalid token'}), 401
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}
+    service_name = data.get('service')
+    if not isinstance(service_name, str) or not SERVICE_NAME_PATTERN.fullmatch(service_name):
+        return jsonify({'error': 'A valid service name is required'}), 400
+    if not auto_deploy_manager.is_enabled_for(service_name):
+        return jsonify({'error': f'Auto deploy is disabled for {service_name}'}), 409
+
+    try:
+        return jsonify(auto_deploy_manager.request_deploy(service_name, 'webhook', data.get('digest'))), 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/auto-deploy')
+def auto_deploy_status():
+    """Pending and recent automatic deploys"""
+    try:
+        return jsonify(auto_deploy_manager.get_status())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/footprint')
+def footprint():
+    """Image, container and volume disk usage per node"""
+    try:
+        return jsonify(footprint_manager.get_footprint())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/gc', methods=['GET', 'POST'])
+def image_gc():
+    """Last garbage collection result on GET, run it on POST (previewed with dry_run=1)"""
+    if request.method == 'GET':
+        return jsonify({'last_run': footprint_manager.last_run})
+
+    dry_run = request.args.get('dry_run', '0') not in ('0', 'false')
+    try:
+        return jsonify(footprint_manager.collect(dry_run=dry_run))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/probes')
+def probes():
+    """Availability and latency from synthetic health probes, per service"""
+    service_names = [name for name in request.args.get('services', '').split(',') if name] or None
+    window_seconds = request.args.get('window', 900, type=int)
+    try:
+        return jsonify(probe_manager.get_summaries(service_names, window_seconds))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/access-stats')
+def access_stats():
+    """Request rate, status mix and latency percentiles from Caddy access logs"""
+    service_names = [name for name in request.args.get('services', '').split(',') if name]
+    if not all(SERVICE_NAME_PATTERN.fullmatch(name) for name in service_names):
+        return jsonify({'error': 'Invalid service name'}), 400
+    window_seconds = request.args.get('window', 300, type=int)
+    if window_seconds < 1:
+        return jsonify({'error': 'window must be at least 1 second'}), 400
+    try:
+        access_log_manager.refresh(service_names)
+        return jsonify(access_log_manager.get_summaries(service_names, window_seconds))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/container-logs/<name>')
 def container_logs(name):
     if not docker_manager.client:
@@ -289,8 +495,7 @@ def update_global_config():
             new_config['caddy'] = current_config['caddy']
         
         # Save updated config
-        with open(config_path, 'w') as f:
-            json.dump(new_config, f, indent=2)
+        ConfigManager().save_config(new_config)
             
         return jsonify({'message': 'Configuration updated successfully'})
     except Exception as e:
@@ -313,36 +518,70 @@ def get_service_env(name):
 @app.route('/service/<name>/env', methods=['POST'])
 def update_service_env(name):
     try:
-        # Load config file
-        config_path = Path(__file__).parent / 'config.json'
-        with open(config_path) as f:
-            config = json.load(f)
-            
-        # Get the updated env vars from request
-        env_vars = request.json
-        
-        # Ensure services dict exists
-        if 'services' not in config:
-            config['services'] = {}
-            
-        # Ensure service entry exists
-        if name not in config['services']:
-            config['services'][name] = {}
-            
-        # Update env vars
-        config['services'][name]['env_vars'] = env_vars
-        
-        # Save config file
-        with open(config_path, 'w') as f:
-            json.dump(config, f, indent=2)
+        # Replace the service's env vars, other settings are kept
+        ConfigManager().update_service_config(name, {'env_vars': request.json})
             
         # Return success
         return jsonify({'message': 'Environment variables updated successfully'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/service/<name>/performance', methods=['GET'])
+def get_service_performance(name):
+    try:
+        performance = ConfigManager().get_services_config().get(name, {}).get('performance', {})
+        return jsonify(performance)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/service/<name>/performance', methods=['POST'])
+def update_service_performance(name):
+    try:
+        performance = CaddyManager.normalize_performance_settings(request.json or {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        ConfigManager().update_service_config(name, {'performance': performance})
+        return jsonify({'message': 'Performance settings updated successfully', 'performance': performance})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/service/<name>/resources', methods=['GET'])
+def get_service_resources(name):
+    """Configured CPU and memory limits with a recommendation from usage history"""
+    try:
+        service_config = ConfigManager().get_services_config().get(name, {})
+        return jsonify({
+            'cpus': service_config.get('cpus'),
+            'mem_limit': service_config.get('mem_limit'),
+            'recommendation': stats_history_manager.recommend_limits(name)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/service/<name>/resources', methods=['POST'])
+def update_service_resources(name):
+    try:
+        limits = AnsibleManager.normalize_resource_limits(request.json or {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        ConfigManager().update_service_config(name, limits)
+        return jsonify({'message': 'Resource limits updated successfully', **limits})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 if __name__ == '__main__':
-    print(f"Connecting to Docker at {os.getenv('DOCKER_HOST')}")
-    if not docker_manager.client:
-        print("Warning: Docker is not available!")
+    # With the reloader only the child process that serves requests runs background workers
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        # Connects in the background, requests are served right away
+        docker_manager.start()
+        autoscale_manager.start()
+        prefetch_manager.start()
+        auto_deploy_manager.start()
+        footprint_manager.start()
+        stats_history_manager.start()
+        probe_manager.start()
     app.run(host='localhost', port=3000, debug=True) 
\ No newline at end of file
@@ -0,0 +1,238 @@
+import json
+import re
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import unquote, urlparse
+
+
+class FakeDockerState:
+    """Mutable fleet state served by FakeDockerEngine"""
+
+    def __init__(self, fleet: Dict, latency_ms: float = 0.0):
+        self.lock = threading.Lock()
+        self.latency_ms = latency_ms
+        self.load(fleet)
+
+    def load(self, fleet: Dict) -> None:
+        with self.lock:
+            self.images = dict(fleet['images'])
+            self.containers = {c['id']: dict(c) for c in fleet['containers']}
+            self.started_at = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+            self.requests = 0
+
+    def find_container(self, ref: str) -> Optional[Dict]:
+        if ref in self.containers:
+            return self.containers[ref]
+        return next((c for c in self.containers.values() if c['name'] == ref), None)
+
+    def find_image(self, ref: str) -> Optional[Dict]:
+        if ref in self.images:
+            return self.images[ref]
+        return next((i for i in self.images.values()
+                     if ref in (i['Id'], i['Id'].split(':')[-1]) or ref in i['RepoTags']), None)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    server_version = 'FakeDocker/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self) -> FakeDockerState:
+        return self.server.state
+
+    def _send(self, status: int, body: bytes = b'', content_type: str = 'application/json') -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Api-Version', '1.41')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, payload, status: int = 200) -> None:
+        self._send(status, json.dumps(payload).encode())
+
+    def _not_found(self, what: str) -> None:
+        self._json({'message': f'No such {what}'}, 404)
+
+    def _route(self, method: str) -> None:
+        with self.state.lock:
+            self.state.requests += 1
+        if self.state.latency_ms:
+            time.sleep(self.state.latency_ms / 1000)
+
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+
+        path = unquote(urlparse(self.path).path)
+        path = re.sub(r'^/v[\d.]+', '', path)
+
+        if path == '/_ping':
+            return self._send(200, b'OK', 'text/plain')
+        if path == '/version':
+            return self._json({'ApiVersion': '1.41', 'Version': '24.0.0', 'Os': 'linux', 'Arch': 'amd64'})
+        if path == '/containers/json' and method == 'GET':
+            return self._json([self._container_summary(c) for c in self.state.containers.values()])
+
+        match = re.match(r'^/containers/([^/]+)(/\w+)?$', path)
+        if match:
+            container = self.state.find_container(match.group(1))
+            if container is None:
+                return self._not_found('container')
+            action = match.group(2) or ''
+            if method == 'GET' and action == '/json':
+                return self._json(self._container_inspect(container))
+            if method == 'GET' and action == '/logs':
+                return self._send(200, self._container_logs(container), 'application/vnd.docker.raw-stream')
+            if method == 'GET' and action == '/stats':
+                return self._json(self._container_stats(container))
+            if method == 'POST' and action in ('/restart', '/start'):
+                container['state'] = 'running'
+                return self._send(204)
+            if method == 'POST' and action == '/stop':
+                container['state'] = 'exited'
+                return self._send(204)
+            if method == 'DELETE' and action == '':
+                with self.state.lock:
+                    self.state.containers.pop(container['id'], None)
+                return self._send(204)
+
+        match = re.match(r'^/images/(.+)/json$', path)
+        if match and method == 'GET':
+            image = self.state.find_image(match.group(1))
+            if image is None:
+                return self._not_found('image')
+            return self._json(image)
+
+        match = re.match(r'^/images/(.+)$', path)
+        if match and method == 'DELETE':
+            image = self.state.find_image(match.group(1))
+            if image is None:
+                return self._not_found('image')
+            if any(c['image_id'] == image['Id'] for c in self.state.containers.values()):
+                return self._json({'message': 'image is being used by a container'}, 409)
+            with self.state.lock:
+                self.state.images = {k: v for k, v in self.state.images.items() if v['Id'] != image['Id']}
+            return self._json([{'Deleted': image['Id']}])
+
+        if path == '/system/df' and method == 'GET':
+            return self._json(self._system_df())
+
+        self._json({'message': f'fake docker: unsupported {method} {path}'}, 404)
+
+    def do_GET(self):
+        self._route('GET')
+
+    def do_POST(self):
+        self._route('POST')
+
+    def do_DELETE(self):
+        self._route('DELETE')
+
+    def do_HEAD(self):
+        self._route('HEAD')
+
+    def _container_summary(self, container: Dict) -> Dict:
+        return {
+            'Id': container['id'],
+            'Names': [f"/{container['name']}"],
+            'Image': container['image'],
+            'ImageID': container['image_id'],
+            'State': container['state'],
+            'Status': 'Up 2 hours' if container['state'] == 'running' else 'Exited (0) 1 hour ago',
+            'Labels': {},
+        }
+
+    def _system_df(self) -> Dict:
+        images = {}
+        for image in self.state.images.values():
+            created = datetime.fromisoformat(image['Created'].replace('Z', '+00:00'))
+            images[image['Id']] = {
+                'Id': image['Id'],
+                'RepoTags': image['RepoTags'],
+                'RepoDigests': image['RepoDigests'],
+                'Created': int(created.timestamp()),
+                'Size': image['Size'],
+                # Every fake image shares a 30 MB base layer
+                'SharedSize': 30_000_000,
+                'Containers': sum(c['image_id'] == image['Id'] for c in self.state.containers.values()),
+            }
+        return {
+            'LayersSize': sum(i['Size'] - i['SharedSize'] for i in images.values()) + 30_000_000,
+            'Images': list(images.values()),
+            'Containers': [dict(self._container_summary(c), SizeRw=1_000_000)
+                           for c in self.state.containers.values()],
+            'Volumes': [],
+            'BuildCache': [],
+        }
+
+    def _container_inspect(self, container: Dict) -> Dict:
+        return {
+            'Id': container['id'],
+            'Name': f"/{container['name']}",
+            'Image': container['image_id'],
+            'Created': '2024-01-01T00:00:00Z',
+            'Platform': 'linux',
+            'Config': {'Image': container['image'], 'Tty': False, 'Labels': {}},
+            'State': {
+                'Status': container['state'],
+                'Running': container['state'] == 'running',
+                'StartedAt': self.state.started_at,
+                'FinishedAt': '0001-01-01T00:00:00Z' if container['state'] == 'running' else '2024-01-01T00:00:00Z',
+            },
+            'HostConfig': {},
+        }
+
+    def _container_logs(self, container: Dict) -> bytes:
+        lines = [f"{container['name']} request {i} handled\n".encode() for i in range(5)]
+        # Multiplexed stdout frames, as sent for containers without a TTY
+        return b''.join(struct.pack('>BxxxL', 1, len(line)) + line for line in lines)
+
+    def _container_stats(self, container: Dict) -> Dict:
+        seed = int(container['id'][:6], 16)
+        return {
+            'cpu_stats': {
+                'cpu_usage': {'total_usage': 2_000_000 + seed % 500_000},
+                'system_cpu_usage': 100_000_000,
+                'online_cpus': 2,
+            },
+            'precpu_stats': {
+                'cpu_usage': {'total_usage': 1_000_000},
+                'system_cpu_usage': 90_000_000,
+            },
+            'memory_stats': {
+                'usage': 64 * 1024 * 1024 + seed % (32 * 1024 * 1024),
+                'limit': 2048 * 1024 * 1024,
+            },
+        }
+
+
+class FakeDockerEngine:
+    """Local HTTP server speaking the subset of the Docker Engine API the dashboard uses"""
+
+    def __init__(self, state: FakeDockerState, host: str = '127.0.0.1', port: int = 0):
+        self.state = state
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.state = state
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def start(self) -> 'FakeDockerEngine':
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
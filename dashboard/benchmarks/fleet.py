@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+from typing import Dict
+
+REGISTRY_URL = 'registry.example.test'
+REGISTRY_NAMESPACE = 'bench'
+BASE_DOMAIN = 'api.example.test'
+CADDY_EMAIL = 'bench@example.test'
+
+
+def _digest(*parts: str) -> str:
+    return 'sha256:' + hashlib.sha256(':'.join(parts).encode()).hexdigest()
+
+
+def build_fleet(size: int) -> Dict:
+    """Build a deterministic fleet description shared by all fakes
+
+    Roughly 85% of services are running, 5% stopped, 10% not deployed, every
+    seventh deployed service runs an outdated image and size // 20 orphaned
+    containers exist that have no registry entry.
+    """
+    services = []
+    containers = []
+    images = {}
+
+    for i in range(size):
+        name = f'svc-{i:03d}'
+        image = f'{REGISTRY_URL}/{REGISTRY_NAMESPACE}/{name}:latest'
+        latest_id = _digest(name, 'latest')
+        images[image] = {
+            'Id': latest_id,
+            'RepoTags': [image],
+            'RepoDigests': [f'{REGISTRY_URL}/{REGISTRY_NAMESPACE}/{name}@{_digest(name, "manifest")}'],
+            'Size': 50_000_000 + i * 100_000,
+            'Created': '2024-01-01T00:00:00Z',
+        }
+        services.append({
+            'name': name,
+            'image': image,
+            'digest': _digest(name, 'manifest'),
+            'port_offset': i,
+        })
+
+        bucket = i % 20
+        if bucket in (18, 19):
+            continue  # not deployed
+
+        image_id = latest_id
+        if i % 7 == 3:
+            image_id = _digest(name, 'previous')
+            images[image_id] = {
+                'Id': image_id,
+                'RepoTags': [],
+                'RepoDigests': [],
+                'Size': 49_000_000,
+                'Created': '2023-12-01T00:00:00Z',
+            }
+
+        containers.append({
+            'id': _digest(name, 'container')[7:],
+            'name': name,
+            'image': image,
+            'image_id': image_id,
+            'state': 'exited' if bucket == 17 else 'running',
+        })
+
+    for i in range(size // 20):
+        name = f'orphan-{i:03d}'
+        image_id = _digest(name, 'image')
+        images[image_id] = {
+            'Id': image_id,
+            'RepoTags': [f'{name}:latest'],
+            'RepoDigests': [],
+            'Size': 20_000_000,
+            'Created': '2023-06-01T00:00:00Z',
+        }
+        containers.append({
+            'id': _digest(name, 'container')[7:],
+            'name': name,
+            'image': f'{name}:latest',
+            'image_id': image_id,
+            'state': 'running',
+        })
+
+    return {
+        'services': services,
+        'containers': containers,
+        'images': images,
+    }
+
+
+def write_config(path: str, docker_port: int) -> None:
+    """Write a dashboard config.json pointing every manager at the fakes"""
+    config = {
+        'ssh_host': {
+            'endpoint': '127.0.0.1',
+            'port': '22',
+            'docker_port': docker_port,
+            'username': 'bench',
+            'password': 'bench',
+        },
+        'filesystem': {
+            'host_path': '/srv/docker',
+            'container_mount_path': '/srv/docker',
+            'mount_env_var': 'APP_MOUNT_PATH',
+        },
+        'caddy': {
+            'email': CADDY_EMAIL,
+            'base_domain': BASE_DOMAIN,
+            'custom_directives': [],
+        },
+        'registry': {
+            'url': REGISTRY_URL,
+            'namespace': REGISTRY_NAMESPACE,
+        },
+        'services': {},
+    }
+    with open(path, 'w') as f:
+        json.dump(config, f, indent=2)
+
+
+def write_ssh_root(root: str, fleet: Dict) -> None:
+    """Write the remote filesystem served by the fake SSH target"""
+    conf_d = os.path.join(root, 'etc', 'caddy', 'conf.d')
+    os.makedirs(conf_d, exist_ok=True)
+    for existing in os.listdir(conf_d):
+        os.remove(os.path.join(conf_d, existing))
+
+    with open(os.path.join(root, 'etc', 'caddy', 'Caddyfile'), 'w') as f:
+        f.write(f'{{\n    email {CADDY_EMAIL}\n}}\n\nimport /etc/caddy/conf.d/*\n')
+
+    deployed = {c['name'] for c in fleet['containers']}
+    for service in fleet['services']:
+        if service['name'] not in deployed:
+            continue
+        with open(os.path.join(conf_d, f"{service['name']}.conf"), 'w') as f:
+            f.write(
+                f"{service['name']}.{BASE_DOMAIN} {{\n"
+                f"    reverse_proxy localhost:{3000 + service['port_offset']}\n"
+                f"    tls {CADDY_EMAIL}\n"
+                f"}}\n"
+            )
+
+    # A few stale entries for services that are gone from the registry
+    for i in range(max(1, len(fleet['services']) // 50)):
+        with open(os.path.join(conf_d, f'retired-{i:03d}.conf'), 'w') as f:
+            f.write(
+                f"retired-{i:03d}.{BASE_DOMAIN} {{\n"
+                f"    reverse_proxy localhost:{5000 + i}\n"
+                f"    tls {CADDY_EMAIL}\n"
+                f"}}\n"
+            )
+
+    for directory in ('srv/docker', 'var/log/caddy'):
+        os.makedirs(os.path.join(root, directory), exist_ok=True)
+
+
+def write_fleet(path: str, fleet: Dict) -> None:
+    with open(path, 'w') as f:
+        json.dump(fleet, f)
+
+
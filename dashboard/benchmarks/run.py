@@ -0,0 +1,223 @@
+"""Benchmark the dashboard against local fakes for doctl, Docker and SSH
+
+Run from the dashboard directory:
+
+    python -m benchmarks.run --sizes 10,100,500 --output bench.json
+    python -m benchmarks.run --sizes 10,100 --compare bench.json
+
+Every manager talks to a stand-in: `benchmarks/fakes/doctl` and
+`benchmarks/fakes/sshpass` are put first on PATH, and the Docker client is
+pointed at an in-process fake Engine API. Results are written as JSON so runs
+from different commits can be compared.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+from .fake_docker import FakeDockerEngine, FakeDockerState
+from .fleet import build_fleet, write_config, write_fleet, write_ssh_root
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FAKES_DIR = os.path.join(BENCH_DIR, 'fakes')
+SCHEMA_VERSION = 1
+
+
+def _git_commit() -> str:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                                capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except Exception:
+        return 'unknown'
+
+
+def _summarize(samples: List[float]) -> Dict:
+    ordered = sorted(samples)
+    p95_index = min(len(ordered) - 1, max(0, round(0.95 * len(ordered)) - 1))
+    return {
+        'samples_ms': [round(s, 3) for s in samples],
+        'min_ms': round(ordered[0], 3),
+        'median_ms': round(statistics.median(ordered), 3),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+        'p95_ms': round(ordered[p95_index], 3),
+        'max_ms': round(ordered[-1], 3),
+    }
+
+
+def _measure(fn: Callable[[], None], repeat: int, warmup: int) -> List[float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _setup_environment(workdir: str, args) -> None:
+    os.environ['PATH'] = FAKES_DIR + os.pathsep + os.environ.get('PATH', '')
+    os.environ['DOCKER_TLS_VERIFY'] = '0'
+    os.environ['DOCKLITE_FAKE_FLEET'] = os.path.join(workdir, 'fleet.json')
+    os.environ['DOCKLITE_FAKE_SSH_ROOT'] = os.path.join(workdir, 'remote')
+    os.environ['DOCKLITE_FAKE_DOCTL_LATENCY_MS'] = str(args.doctl_latency_ms)
+    os.environ['DOCKLITE_FAKE_SSH_LATENCY_MS'] = str(args.ssh_latency_ms)
+
+
+def run(args) -> Dict:
+    results = []
+    with tempfile.TemporaryDirectory(prefix='docklite-bench-') as workdir:
+        _setup_environment(workdir, args)
+        state = FakeDockerState(build_fleet(args.sizes[0]), latency_ms=args.docker_latency_ms)
+        engine = FakeDockerEngine(state).start()
+
+        config_path = os.path.join(workdir, 'config.json')
+        write_config(config_path, engine.port)
+
+        # Point the managers at the fake config before anything constructs them
+        from managers.file_paths import file_paths
+        file_paths['config_json'] = config_path
+        file_paths['ansible_dir'] = workdir
+        file_paths['scheduler_json'] = os.path.join(workdir, 'scheduler.json')
+        file_paths['stats_db'] = os.path.join(workdir, 'stats.db')
+
+        import app as dashboard_app
+        dashboard_app.docker_manager.wait_until_connected()
+        client = dashboard_app.app.test_client()
+
+        try:
+            for size in args.sizes:
+                fleet = build_fleet(size)
+                write_fleet(os.environ['DOCKLITE_FAKE_FLEET'], fleet)
+                write_ssh_root(os.environ['DOCKLITE_FAKE_SSH_ROOT'], fleet)
+                state.load(fleet)
+                running = [c['name'] for c in fleet['containers']
+                           if c['state'] == 'running' and not c['name'].startswith('orphan-')]
+                active_domains = {f"{s['name']}.{dashboard_app.ConfigManager().get_caddy_config()['base_domain']}"
+                                  for s in fleet['services']}
+
+                def index_render():
+                    response = client.get('/')
+                    assert response.status_code == 200, response.status_code
+
+                def deploy_planning():
+                    services = dashboard_app.registry_manager.list_images()
+                    dashboard_app.ansible_manager.prepare_services_vars(services, write_to_file=False)
+
+                def caddy_inspection():
+                    result = dashboard_app.caddy_manager.get_full_config(active_domains)
+                    assert 'error' not in result, result
+
+                def stats_polling():
+                    for name in running:
+                        response = client.get(f'/container-stats/{name}')
+                        assert response.status_code == 200, response.get_data(as_text=True)
+
+                scenarios = {
+                    'index_render': index_render,
+                    'deploy_planning': deploy_planning,
+                    'caddy_inspection': caddy_inspection,
+                    'stats_polling': stats_polling,
+                }
+                for scenario, fn in scenarios.items():
+                    if args.scenarios and scenario not in args.scenarios:
+                        continue
+                    state.requests = 0
+                    samples = _measure(fn, args.repeat, args.warmup)
+                    result = {
+                        'scenario': scenario,
+                        'fleet_size': size,
+                        'docker_requests_per_run': state.requests // (args.repeat + args.warmup),
+                        **_summarize(samples),
+                    }
+                    results.append(result)
+                    print(f"{scenario:<18} size={size:<4} median={result['median_ms']:>10.2f} ms  "
+                          f"p95={result['p95_ms']:>10.2f} ms  docker_requests={result['docker_requests_per_run']}",
+                          file=sys.stderr)
+        finally:
+            engine.stop()
+
+    return {
+        'schema': SCHEMA_VERSION,
+        'commit': _git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'params': {
+            'sizes': args.sizes,
+            'repeat': args.repeat,
+            'warmup': args.warmup,
+            'docker_latency_ms': args.docker_latency_ms,
+            'doctl_latency_ms': args.doctl_latency_ms,
+            'ssh_latency_ms': args.ssh_latency_ms,
+        },
+        'results': results,
+    }
+
+
+def compare(baseline: Dict, current: Dict) -> List[Dict]:
+    """Compare median latencies of two result files, keyed by scenario and fleet size"""
+    previous = {(r['scenario'], r['fleet_size']): r for r in baseline['results']}
+    rows = []
+    for result in current['results']:
+        before = previous.get((result['scenario'], result['fleet_size']))
+        if not before:
+            continue
+        ratio = result['median_ms'] / before['median_ms'] if before['median_ms'] else None
+        rows.append({
+            'scenario': result['scenario'],
+            'fleet_size': result['fleet_size'],
+            'baseline_median_ms': before['median_ms'],
+            'median_ms': result['median_ms'],
+            'ratio': round(ratio, 3) if ratio is not None else None,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the DockLite dashboard against local fakes')
+    parser.add_argument('--sizes', default='10,50,100',
+                        help='Comma separated fleet sizes, 10 to 500 services (default: 10,50,100)')
+    parser.add_argument('--repeat', type=int, default=5, help='Measured runs per scenario')
+    parser.add_argument('--warmup', type=int, default=1, help='Unmeasured runs per scenario')
+    parser.add_argument('--scenarios', default='',
+                        help='Comma separated subset of index_render,deploy_planning,caddy_inspection,stats_polling')
+    parser.add_argument('--docker-latency-ms', type=float, default=1.0, help='Latency added to each Docker API call')
+    parser.add_argument('--doctl-latency-ms', type=float, default=5.0, help='Latency added to each doctl invocation')
+    parser.add_argument('--ssh-latency-ms', type=float, default=5.0, help='Latency added to each SSH command')
+    parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    parser.add_argument('--compare', help='Baseline JSON results to compare against')
+    args = parser.parse_args()
+
+    args.sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    if any(size < 10 or size > 500 for size in args.sizes):
+        parser.error('fleet sizes must be between 10 and 500')
+    args.scenarios = {s.strip() for s in args.scenarios.split(',') if s.strip()}
+
+    report = run(args)
+
+    if args.compare:
+        with open(args.compare) as f:
+            report['comparison'] = compare(json.load(f), report)
+        for row in report['comparison']:
+            print(f"{row['scenario']:<18} size={row['fleet_size']:<4} "
+                  f"{row['baseline_median_ms']:>10.2f} -> {row['median_ms']:>10.2f} ms  x{row['ratio']}",
+                  file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""Deploy services from the command line, several at a time
+
+    python deploy_cli.py svc-a svc-b --concurrency 2
+    python deploy_cli.py --all --plan
+    python deploy_cli.py svc-a --dry-run --json > result.json
+
+Progress is printed to stderr per service. With --json the results, including
+per-phase timings, are written to stdout. The exit code is 0 only if every
+service deployed.
+"""
+import argparse
+import contextlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+import yaml
+from dotenv import load_dotenv
+
+from managers.ansible_manager import AnsibleManager
+from managers.deployment_lock import DeploymentLock
+from managers.docker_manager import DockerManager
+from managers.doctl_registry_manager import RegistryManager
+
+# Phases timed per service, registry lookup and vars prep run once for the whole batch
+PHASES = ['pull', 'recreate', 'caddy']
+
+# deploy.yml tasks that update Caddy, every other task counts towards recreating containers
+CADDY_TASKS = {'Configure Caddy for each service', 'Configure main Caddy file', 'reload caddy'}
+
+TASK_PATTERN = re.compile(r'^(?:TASK|RUNNING HANDLER) \[(?:[^\]:]+ : )?([^\]]+)\]')
+
+_print_lock = threading.Lock()
+
+
+def _progress(service_name: str, message: str) -> None:
+    with _print_lock:
+        print(f"[{service_name}] {message}", file=sys.stderr, flush=True)
+
+
+class BatchDeployer:
+    """Deploys services with one Ansible run per service, at most concurrency at a time"""
+
+    def __init__(self, concurrency: int = 4, dry_run: bool = False, verbose: bool = False):
+        self.concurrency = concurrency
+        self.dry_run = dry_run
+        self.verbose = verbose
+        self.docker_manager = DockerManager()
+        self.ansible_manager = AnsibleManager(self.docker_manager)
+        self.registry_manager = RegistryManager()
+
+    def lookup(self, service_names: List[str], deploy_all: bool) -> Tuple[List[Dict], float, List[str]]:
+        """Find the services in the registry, returning (services, seconds, missing names)"""
+        started = time.perf_counter()
+        available = self.registry_manager.list_images() or []
+        elapsed = time.perf_counter() - started
+        if deploy_all:
+            return available, elapsed, []
+        by_name = {service['name']: service for service in available}
+        return ([by_name[name] for name in service_names if name in by_name], elapsed,
+                [name for name in service_names if name not in by_name])
+
+    def plan(self, services: List[Dict]) -> List[Dict]:
+        """Placement, ports and whether an image pull is needed, without changing anything"""
+        service_vars = self.ansible_manager.prepare_services_vars(services, write_to_file=False)['api_services']
+        digests = {service['name']: service.get('digest') for service in services}
+        plan = []
+        for config in service_vars:
+            plan.append({
+                'name': config['name'],
+                'image': config['image'],
+                'digest': digests.get(config['name']),
+                'node': config['node'],
+                'replicas': [{'name': r['name'], 'port': 3000 + r['port_offset']} for r in config['replicas']],
+                'stale_replicas': config['stale_replicas'],
+                'moved_containers': config['moved_containers'],
+                'pull_needed': not self.docker_manager.has_image_digest(
+                    config['node'], config['image'], digests.get(config['name'])),
+                'cpus': config.get('cpus'),
+                'mem_limit': config.get('mem_limit'),
+            })
+        return plan
+
+    def _pull(self, service: Dict, node_name: str) -> bool:
+        """Pull the image onto its node unless that digest is already there"""
+        if self.docker_manager.has_image_digest(node_name, service['image'], service.get('digest')):
+            return False
+        self.docker_manager.pull_image(node_name, service['image'])
+        return True
+
+    def _run_playbook(self, name: str, vars_file: str, phases: Dict[str, float]) -> bool:
+        """Run deploy.yml for one service, adding task durations to the recreate and caddy phases"""
+        playbook = self.ansible_manager.run_playbook('deploy.yml', f'services_vars_file={vars_file}',
+                                                     check=self.dry_run)
+        current_phase, phase_started = 'recreate', time.perf_counter()
+        while True:
+            try:
+                line = next(playbook).removeprefix('data: ').rstrip()
+            except StopIteration as stop:
+                phases[current_phase] += time.perf_counter() - phase_started
+                return bool(stop.value)
+
+            match = TASK_PATTERN.match(line)
+            if match or line.startswith('PLAY RECAP'):
+                now = time.perf_counter()
+                phases[current_phase] += now - phase_started
+                phase_started = now
+                if match:
+                    current_phase = 'caddy' if match.group(1).strip() in CADDY_TASKS else 'recreate'
+                    _progress(name, f"{current_phase}: {match.group(1).strip()}")
+            elif self.verbose or 'fatal:' in line or 'FAILED' in line:
+                _progress(name, line)
+
+    def deploy_one(self, service: Dict, config: Dict, workdir: str) -> Dict:
+        name = service['name']
+        phases = dict.fromkeys(PHASES, 0.0)
+        result = {'name': name, 'node': config['node'], 'image': service['image'], 'success': False}
+        started = time.perf_counter()
+        try:
+            if not self.dry_run:
+                _progress(name, f"pull: {service['image']} on {config['node']}")
+                pull_started = time.perf_counter()
+                result['pulled'] = self._pull(service, config['node'])
+                phases['pull'] = time.perf_counter() - pull_started
+                # The image is on the node now, Ansible only has to recreate the containers
+                config = dict(config, pull=False)
+
+            vars_file = os.path.join(workdir, f'{name}.yml')
+            with open(vars_file, 'w') as f:
+                yaml.dump({'api_services': [config]}, f)
+
+            result['success'] = self._run_playbook(name, vars_file, phases)
+            if not result['success']:
+                result['error'] = 'ansible-playbook failed'
+        except Exception as e:
+            result['error'] = str(e)
+
+        result['phases'] = {phase: round(seconds, 3) for phase, seconds in phases.items()}
+        result['duration_seconds'] = round(time.perf_counter() - started, 3)
+        _progress(name, ('done' if result['success'] else f"failed: {result.get('error')}") +
+                  f" in {result['duration_seconds']}s")
+        return result
+
+    def deploy(self, services: List[Dict]) -> Tuple[List[Dict], float]:
+        """Deploy services, returning their results and the seconds spent preparing vars"""
+        self.docker_manager.wait_until_connected()
+        # The dashboard rewrites the same inventory and vars files when it deploys
+        lock = DeploymentLock()
+        if not lock.acquire(blocking=False):
+            print('Waiting for another deployment to finish...', file=sys.stderr, flush=True)
+            lock.acquire()
+        try:
+            workdir = tempfile.mkdtemp(prefix='docklite-deploy-')
+            cleanup_files = self.ansible_manager.setup_deployment()
+            try:
+                # Prepare all services together so new replicas get distinct ports
+                started = time.perf_counter()
+                service_vars = self.ansible_manager.prepare_services_vars(
+                    services, write_to_file=not self.dry_run, vars_file=os.path.join(workdir, 'all.yml'))
+                vars_seconds = time.perf_counter() - started
+                configs = {config['name']: config for config in service_vars['api_services']}
+
+                with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                    futures = [executor.submit(self.deploy_one, service, configs[service['name']], workdir)
+                               for service in services]
+                    return [future.result() for future in futures], vars_seconds
+            finally:
+                for file in cleanup_files:
+                    if os.path.exists(file):
+                        os.remove(file)
+                shutil.rmtree(workdir, ignore_errors=True)
+        finally:
+            lock.release()
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description='Deploy services from the registry')
+    parser.add_argument('services', nargs='*', help='Names of the services to deploy')
+    parser.add_argument('--all', action='store_true', help='Deploy every service in the registry')
+    parser.add_argument('--concurrency', type=int, default=4, help='Services deployed at the same time (default: 4)')
+    parser.add_argument('--plan', action='store_true', help='Only print placement, ports and pulls, change nothing')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Run Ansible in check mode, reporting changes without making them')
+    parser.add_argument('--json', action='store_true', help='Write results as JSON to stdout')
+    parser.add_argument('--verbose', action='store_true', help='Print all Ansible output')
+    args = parser.parse_args()
+
+    if not args.services and not args.all:
+        parser.error('name at least one service or pass --all')
+    if args.concurrency < 1:
+        parser.error('--concurrency must be at least 1')
+
+    deployer = BatchDeployer(args.concurrency, dry_run=args.dry_run, verbose=args.verbose)
+    started_at = datetime.now(timezone.utc).isoformat()
+    started = time.perf_counter()
+
+    # Managers print as they go, keep stdout for the JSON report
+    with contextlib.redirect_stdout(sys.stderr if args.json else sys.stdout):
+        report, success = run(deployer, args)
+
+    report['started_at'] = started_at
+    report['success'] = success
+    report['duration_seconds'] = round(time.perf_counter() - started, 3)
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    sys.exit(0 if success else 1)
+
+
+def run(deployer: BatchDeployer, args: argparse.Namespace) -> Tuple[Dict, bool]:
+    """Plan or deploy the requested services, returning (report, success)"""
+    services, lookup_seconds, missing = deployer.lookup(args.services, args.all)
+    for name in missing:
+        _progress(name, 'not found in registry')
+
+    mode = 'plan' if args.plan else 'dry_run' if args.dry_run else 'deploy'
+    report = {
+        'mode': mode,
+        'concurrency': args.concurrency,
+        'phases': {'registry_lookup': round(lookup_seconds, 3)},
+        'missing': missing,
+    }
+
+    if args.plan:
+        deployer.docker_manager.wait_until_connected()
+        report['plan'] = deployer.plan(services) if services else []
+        success = not missing
+        if not args.json:
+            for entry in report['plan']:
+                ports = ', '.join(f"{r['name']}:{r['port']}" for r in entry['replicas'])
+                print(f"{entry['name']}: {entry['node']} [{ports}]"
+                      f"{' pull' if entry['pull_needed'] else ''}"
+                      f"{' remove ' + ', '.join(entry['stale_replicas']) if entry['stale_replicas'] else ''}"
+                      f"{' move from ' + entry['moved_containers'][0]['node'] if entry['moved_containers'] else ''}")
+    else:
+        results, vars_seconds = deployer.deploy(services) if services else ([], 0.0)
+        report['phases']['vars_prep'] = round(vars_seconds, 3)
+        report['services'] = results
+        success = not missing and all(result['success'] for result in report['services'])
+        if not args.json:
+            print(' '.join(f"{phase}={seconds}s" for phase, seconds in report['phases'].items()))
+            for result in report['services']:
+                timings = ' '.join(f"{phase}={seconds}s" for phase, seconds in result['phases'].items())
+                print(f"{result['name']}: {'ok' if result['success'] else 'FAILED'} {timings}")
+    return report, success
+
+
+if __name__ == '__main__':
+    main()
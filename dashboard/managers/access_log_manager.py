@@ -0,0 +1,204 @@
+import json
+import shlex
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from .config_manager import ConfigManager, SERVICE_NAME_PATTERN
+from .quantile_sketch import QuantileSketch
+from .ssh_manager import run_ssh_command
+
+# Markers printed around each log chunk; access logs are JSON lines so they cannot collide
+SECTION_MARKER = '==docklite-access-log=='
+STAT_MARKER = '==docklite-access-log-stat=='
+
+
+class _Bucket:
+    """Requests of one service that started within one bucket interval"""
+
+    def __init__(self, start: float):
+        self.start = start
+        self.count = 0
+        self.status: Dict[str, int] = {}
+        self.latency = QuantileSketch()
+
+
+class AccessLogManager:
+    """Incrementally tails Caddy's per-service JSON access logs over SSH
+
+    A byte-offset cursor is kept per log file so every refresh only transfers
+    lines written since the last one. Requests are aggregated into fixed time
+    buckets holding a request count, the status code mix and a latency sketch,
+    and summaries merge the buckets inside the requested window.
+    """
+
+    def __init__(self, bucket_seconds: int = 10, retention_seconds: int = 900,
+                 max_bytes_per_refresh: int = 1024 * 1024, backfill_bytes: int = 256 * 1024,
+                 min_refresh_interval: float = 5.0):
+        self.log_dir = '/var/log/caddy'
+        self.bucket_seconds = bucket_seconds
+        self.retention_seconds = retention_seconds
+        self.max_bytes_per_refresh = max_bytes_per_refresh
+        self.backfill_bytes = backfill_bytes
+        self.min_refresh_interval = min_refresh_interval
+        self.cursors: Dict[str, int] = {}
+        self.inodes: Dict[str, str] = {}
+        self.buckets: Dict[str, Deque[_Bucket]] = {}
+        self.last_refresh: Dict[str, float] = {}
+        # Logs whose cursor was placed by a backfill and may point into the middle of a line
+        self.mid_line: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def log_path(self, service_name: str) -> str:
+        return f'{self.log_dir}/{service_name}.access.log'
+
+    def _build_command(self, service_names: List[str]) -> str:
+        """One SSH round trip printing size and new bytes of every log"""
+        parts = []
+        for name in service_names:
+            if not SERVICE_NAME_PATTERN.fullmatch(name):
+                raise ValueError(f'Invalid service name: {name!r}')
+            path = shlex.quote(self.log_path(name))
+            cursor = self.cursors.get(name)
+            if cursor is None:
+                # First look at this log: only its size, the backfill is read from a cursor like new lines
+                read = ':'
+            else:
+                read = f'sudo tail -c +{cursor + 1} {path} 2>/dev/null | head -c {self.max_bytes_per_refresh}'
+            parts.append(f"echo {SECTION_MARKER} {shlex.quote(name)}; {read}; echo; echo {STAT_MARKER}; "
+                         f"(sudo stat -c '%i %s' {path} 2>/dev/null || echo - -1)")
+        return '; '.join(parts)
+
+    @staticmethod
+    def _parse_output(output: str) -> Dict[str, Tuple[str, int, str]]:
+        """Split command output into {service_name: (inode, file_size, new_data)}"""
+        sections = {}
+        for section in output.split(f'{SECTION_MARKER} ')[1:]:
+            name, _, rest = section.partition('\n')
+            # The separator takes the newline echoed after each chunk with it
+            data, _, stat = rest.rpartition(f'\n{STAT_MARKER}\n')
+            inode, _, size = stat.strip().partition(' ')
+            sections[name.strip()] = (inode, int(size or -1), data)
+        return sections
+
+    def _ingest(self, service_name: str, lines: List[str]) -> None:
+        buckets = self.buckets.setdefault(service_name, deque())
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if 'status' not in entry or 'ts' not in entry:
+                continue
+
+            start = entry['ts'] - entry['ts'] % self.bucket_seconds
+            bucket = next((b for b in reversed(buckets) if b.start == start), None)
+            if bucket is None:
+                bucket = _Bucket(start)
+                buckets.append(bucket)
+                if len(buckets) > 1 and buckets[-2].start > start:
+                    # Out of order line, keep buckets sorted by start
+                    buckets = deque(sorted(buckets, key=lambda b: b.start))
+                    self.buckets[service_name] = buckets
+
+            bucket.count += 1
+            status_class = f"{int(entry['status']) // 100}xx"
+            bucket.status[status_class] = bucket.status.get(status_class, 0) + 1
+            bucket.latency.add(float(entry.get('duration', 0)) * 1000)
+
+        cutoff = time.time() - self.retention_seconds
+        while buckets and buckets[0].start < cutoff:
+            buckets.popleft()
+
+    def refresh(self, service_names: List[str], force: bool = False) -> None:
+        """Fetch and aggregate log lines written since the last refresh"""
+        with self._lock:
+            now = time.time()
+            due = [name for name in service_names
+                   if force or now - self.last_refresh.get(name, 0.0) >= self.min_refresh_interval]
+            if not due:
+                return
+
+            new_logs = self._fetch(due)
+            if new_logs:
+                # Read the backfill of logs seen for the first time
+                self._fetch(new_logs)
+            for name in due:
+                self.last_refresh[name] = now
+
+    def _fetch(self, service_names: List[str]) -> List[str]:
+        """Read new lines of the logs, returning the logs that only got a cursor"""
+        success, stdout, stderr = run_ssh_command(self._build_command(service_names),
+                                                  node=ConfigManager().get_ingress_node())
+        if not success and not stdout:
+            raise Exception(f'Failed to read access logs: {stderr}')
+
+        new_logs = []
+        for name, (inode, size, data) in self._parse_output(stdout).items():
+            if size < 0:
+                continue  # log does not exist (yet)
+
+            cursor = self.cursors.get(name)
+            previous_inode = self.inodes.get(name)
+            self.inodes[name] = inode
+            if cursor is None:
+                # One byte before the backfill, so a cursor landing on a line start is recognised
+                self.cursors[name] = max(0, size - self.backfill_bytes - 1)
+                if self.cursors[name] > 0:
+                    self.mid_line.add(name)
+                new_logs.append(name)
+                continue
+
+            if size < cursor or inode != previous_inode:
+                # Log was rotated or truncated, start over on the new file
+                self.cursors[name] = 0
+                self.mid_line.discard(name)
+                continue
+
+            # Only consume complete lines, a partial last line is read again next time
+            complete, _, _ = data.rpartition('\n')
+            if complete or data.startswith('\n'):
+                self.cursors[name] = cursor + len(complete.encode()) + 1
+                lines = complete.split('\n')
+                if name in self.mid_line:
+                    # Drop the rest of the line the cursor pointed into
+                    self.mid_line.discard(name)
+                    lines = lines[1:]
+                self._ingest(name, [line for line in lines if line.strip()])
+        return new_logs
+
+    def get_summary(self, service_name: str, window_seconds: int = 300) -> Optional[Dict]:
+        """Get request rate, status mix and latency percentiles over the last window"""
+        buckets = self.buckets.get(service_name)
+        if self.cursors.get(service_name) is None:
+            return None
+
+        cutoff = time.time() - window_seconds
+        latency = QuantileSketch()
+        status: Dict[str, int] = {}
+        count = 0
+        for bucket in buckets or []:
+            if bucket.start + self.bucket_seconds <= cutoff:
+                continue
+            count += bucket.count
+            latency.merge(bucket.latency)
+            for status_class, n in bucket.status.items():
+                status[status_class] = status.get(status_class, 0) + n
+
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value, 1) if value is not None else None
+
+        return {
+            'window_seconds': window_seconds,
+            'requests': count,
+            'rps': round(count / window_seconds, 3),
+            'status': status,
+            'error_rate': round(status.get('5xx', 0) / count, 4) if count else 0.0,
+            'p50_ms': ms(latency.quantile(0.50)),
+            'p95_ms': ms(latency.quantile(0.95)),
+            'p99_ms': ms(latency.quantile(0.99)),
+        }
+
+    def get_summaries(self, service_names: List[str], window_seconds: int = 300) -> Dict[str, Optional[Dict]]:
+        return {name: self.get_summary(name, window_seconds) for name in service_names}
@@ -1,6 +1,8 @@
 import json
 import os
 import subprocess
+import threading
+import time
 from typing import Dict, List, Optional, Generator, Tuple
 import yaml
 import re
@@ -8,35 +10,91 @@ import re
 from .file_paths import file_paths
 from .config_manager import ConfigManager
 from .caddy_manager import CaddyManager
+from .scheduler_manager import SchedulerManager
 
 from pathlib import Path
 
+# Multipliers of the size suffixes Docker accepts for memory limits
+MEMORY_UNITS = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+
 class AnsibleManager:
-    def __init__(self):
+    def __init__(self, docker_manager=None):
         self.config_manager = ConfigManager()
         self.caddy_manager = CaddyManager()
+        self.scheduler_manager = SchedulerManager()
+        self.docker_manager = docker_manager
+        self._port_offsets: Optional[Dict[str, List[int]]] = None
+        self._port_offsets_at = 0.0
+        self._port_offsets_lock = threading.Lock()
+
+    def get_port_offsets(self, max_age_seconds: float = 300) -> Dict[str, List[int]]:
+        """Port offsets of every deployed replica, re-read from Caddy once older than max_age_seconds"""
+        with self._port_offsets_lock:
+            if self._port_offsets is None or time.time() - self._port_offsets_at > max_age_seconds:
+                self._port_offsets = self._get_existing_port_offsets()
+                self._port_offsets_at = time.time()
+            return self._port_offsets
 
-    def _get_existing_port_offsets(self) -> Dict[str, int]:
-        """Get existing port offsets from Caddy configurations"""
+    def _get_existing_port_offsets(self) -> Dict[str, List[int]]:
+        """Get existing port offsets of every replica from Caddy configurations"""
         port_offsets = {}
         success, files, _ = self.caddy_manager.get_conf_d_files()
         
         if success and files:
             for file in files:
-                # Domain is the filename without extension
-                domain = os.path.splitext(file)[0]
+                # Config files are named after the service
+                service_name = os.path.splitext(file)[0]
                 success, content, _ = self.caddy_manager.get_conf_d_file_content(file)
                 if success:
-                    # Look for reverse_proxy lines with port numbers
-                    matches = re.findall(r'reverse_proxy localhost:(\d+)', content)
-                    if matches:
-                        port = int(matches[0])
-                        port_offsets[domain] = port - 3000
+                    # Look for reverse_proxy lines, one upstream per replica
+                    match = re.search(r'reverse_proxy ([^{\n]+)', content)
+                    if match:
+                        ports = re.findall(r':(\d+)', match.group(1))
+                        port_offsets[service_name] = [int(port) - 3000 for port in ports]
                             
         return port_offsets
 
-    def prepare_service_vars(self, service_name: str, image: str, domain: str, port_offset: int = 0) -> dict:
+    @staticmethod
+    def normalize_resource_limits(limits: Dict) -> Dict:
+        """Validate cpus and mem_limit, keeping None to clear a limit
+
+        Raises ValueError describing the first invalid setting.
+        """
+        normalized = {}
+        if 'cpus' in limits:
+            cpus = limits['cpus']
+            if cpus not in (None, ''):
+                try:
+                    cpus = float(cpus)
+                except (TypeError, ValueError):
+                    raise ValueError(f"cpus must be a number: {cpus!r}")
+                if cpus <= 0:
+                    raise ValueError('cpus must be greater than 0')
+            normalized['cpus'] = cpus or None
+        if 'mem_limit' in limits:
+            mem_limit = str(limits['mem_limit'] or '').strip().lower()
+            match = re.match(r'^(\d+)([kmg]?)$', mem_limit)
+            if mem_limit and not match:
+                raise ValueError(f"mem_limit must be a size like 512m or 1g: {mem_limit!r}")
+            if match and int(match.group(1)) * MEMORY_UNITS[match.group(2)] < 6 * MEMORY_UNITS['m']:
+                raise ValueError('mem_limit must be at least 6m')  # Docker's minimum
+            normalized['mem_limit'] = mem_limit or None
+        return normalized
+
+    @staticmethod
+    def replica_name(service_name: str, index: int) -> str:
+        """Container name of a replica; the first replica keeps the service name"""
+        return service_name if index == 0 else f"{service_name}-replica-{index}"
+
+    def prepare_service_vars(self, service_name: str, image: str, domain: str, port_offset: int = 0,
+                             node: Optional[Dict] = None, replica_port_offsets: Optional[List[int]] = None,
+                             stale_replicas: Optional[List[str]] = None,
+                             moved_containers: Optional[List[Dict]] = None) -> dict:
         """Prepare service configuration with env vars and mount paths from config"""
+        if node is None:
+            node = self.config_manager.get_ingress_node()
+        if replica_port_offsets is None:
+            replica_port_offsets = [port_offset]
         
         # Get env vars for service
         service_config = self.config_manager.get_services_config().get(service_name, {})
@@ -54,41 +112,90 @@ class AnsibleManager:
             'env_vars': env_vars,
             'host_path': f"{host_path}/{service_name}",
             'container_mount_path': f"{container_mount_path}/{service_name}",
-            'port_offset': port_offset
+            'port_offset': replica_port_offsets[0],
+            'replicas': [
+                {'name': self.replica_name(service_name, i), 'port_offset': offset}
+                for i, offset in enumerate(replica_port_offsets)
+            ],
+            'stale_replicas': stale_replicas or [],
+            'moved_containers': moved_containers or [],
+            'health_path': service_config.get('health_path', '/health'),
+            # Validated again here as config.json can be edited by hand
+            'performance': CaddyManager.normalize_performance_settings(service_config.get('performance', {})),
+            'cpus': service_config.get('cpus'),
+            'mem_limit': service_config.get('mem_limit'),
+            'node': node['name'],
+            # Services on the ingress node stay on loopback, others are reached over the private network
+            'bind_address': '127.0.0.1' if node['ingress'] else node['private_address'],
+            'upstream_host': 'localhost' if node['ingress'] else node['private_address'],
         }
         
-    def prepare_services_vars(self, services: List[Dict[str, str]], write_to_file: bool = False) -> dict:
+    def prepare_services_vars(self, services: List[Dict[str, str]], write_to_file: bool = False,
+                              vars_file: Optional[str] = None) -> dict:
+        services_config = self.config_manager.get_services_config()
+
         # Get existing port offsets from Caddy configs
         existing_port_offsets = self._get_existing_port_offsets()
-        used_port_offsets = set(existing_port_offsets.values())
+        used_port_offsets = {offset for offsets in existing_port_offsets.values() for offset in offsets}
+
         next_available_offset = max(used_port_offsets, default=-1) + 1
+
+        # Place services onto nodes, keeping running containers where they are
+        nodes = {node['name']: node for node in self.config_manager.get_nodes_config()}
+        current_nodes = self.docker_manager.get_container_nodes() if self.docker_manager else {}
+        placements = self.scheduler_manager.place_services([s['name'] for s in services], current_nodes,
+                                                          persist=write_to_file)
         
         # Prepare service configs with env vars
         service_configs = []
         for service in services:
-            # Try to get existing port offset from Caddy config
-            port_offset = existing_port_offsets.get(service['domain'])
-            
-            # If no existing port offset, use next available
-            if port_offset is None:
-                port_offset = next_available_offset
+            replicas = max(1, int(services_config.get(service['name'], {}).get('replicas', 1)))
+
+            # Keep the ports replicas already have, allocate free ones for new replicas
+            existing = existing_port_offsets.get(service['name'], [])
+            replica_port_offsets = existing[:replicas]
+            while len(replica_port_offsets) < replicas:
+                replica_port_offsets.append(next_available_offset)
                 next_available_offset += 1
+
+            # Replica containers beyond the wanted count get removed on deploy
+            replica_pattern = re.compile(rf"^{re.escape(service['name'])}-replica-(\d+)$")
+            known_replicas = {self.replica_name(service['name'], i) for i in range(1, len(existing))}
+            known_replicas.update(name for name in current_nodes if replica_pattern.match(name))
+            stale_replicas = sorted(name for name in known_replicas
+                                    if int(replica_pattern.match(name).group(1)) >= replicas)
+
+            # A service pinned to another node leaves its containers behind on the old one
+            node_name = placements[service['name']]
+            moved_containers = [{'name': name, 'node': current_node}
+                                for name, current_node in sorted(current_nodes.items())
+                                if current_node != node_name and
+                                (name == service['name'] or replica_pattern.match(name))]
             
             service_config = self.prepare_service_vars(
                 service_name=service['name'],
                 image=service['image'],
                 domain=service['domain'],
-                port_offset=port_offset
+                node=nodes[node_name],
+                replica_port_offsets=replica_port_offsets,
+                stale_replicas=stale_replicas,
+                moved_containers=moved_containers
             )
+            if write_to_file and self.docker_manager and service.get('digest'):
+                # Skip the registry round trip when the prefetcher already pulled this digest
+                service_config['pull'] = not self.docker_manager.has_image_digest(
+                    service_config['node'], service['image'], service['digest'])
             service_configs.append(service_config)
         
         # Create temporary vars file for all services
         service_vars = {'api_services': service_configs}
 
-        temp_vars_file = os.path.join(file_paths['ansible_dir'], 'vars', 'services_to_deploy.yml')
+        temp_vars_file = vars_file or os.path.join(file_paths['ansible_dir'], 'vars', 'services_to_deploy.yml')
         if write_to_file:
             with open(temp_vars_file, 'w') as f:
                 yaml.dump(service_vars, f)
+            # The deploy rewrites the Caddy configs these are read from
+            self._port_offsets = None
 
         return service_vars
 
@@ -110,18 +217,28 @@ class AnsibleManager:
         # Create inventory file
         inventory_path = file_paths['inventory_yml']
 
-        ssh_host_config = self.config_manager.get_ssh_host_config()
+        nodes = self.config_manager.get_nodes_config()
+        ingress_node = self.config_manager.get_ingress_node()
+
+        hosts = ""
+        for node in nodes:
+            hosts += f"""        {node['name']}:
+          ansible_host: {node['endpoint']}
+          ansible_user: {node['username']}
+          ansible_password: {node['password']}
+          ansible_become_password: {node['password']}
+          docker_config_file: {docker_config}
+          node_ingress: {str(node['ingress']).lower()}
+"""
 
         with open(inventory_path, 'w') as f:
             f.write(f"""all:
-  hosts:
-    api_server:
-      ansible_host: {ssh_host_config['endpoint']}
-      ansible_user: {ssh_host_config['username']}
-      ansible_password: {ssh_host_config['password']}
-      ansible_become_password: {ssh_host_config['password']}
-      docker_config_file: {docker_config}
-""")
+  vars:
+    ingress_private_address: {ingress_node['private_address']}
+  children:
+    api_servers:
+      hosts:
+{hosts}""")
         cleanup_files.append(inventory_path)
 
         # print the inventory file
@@ -134,12 +251,14 @@ class AnsibleManager:
         
         return cleanup_files
         
-    def run_playbook(self, playbooks: str | list[str], extra_vars: Optional[str] = None) -> Generator[str, None, bool]:
+    def run_playbook(self, playbooks: str | list[str], extra_vars: Optional[str] = None,
+                     check: bool = False) -> Generator[str, None, bool]:
         """Run one or more Ansible playbooks and yield output
         
         Args:
             playbooks: Either a single playbook string or list of playbook strings
             extra_vars: Extra vars to apply to all playbooks
+            check: Run in check mode, reporting changes without making them
         """
         inventory_path = file_paths['inventory_yml'] 
         
@@ -157,6 +276,8 @@ class AnsibleManager:
             
         if extra_vars:
             cmd.extend(['-e', extra_vars])
+        if check:
+            cmd.extend(['--check', '--diff'])
             
         process = subprocess.Popen(
             cmd,
@@ -175,7 +296,9 @@ class AnsibleManager:
                 yield f"data: {output}\n\n"
                 if "failed=0" in output and "unreachable=0" in output:
                     success = True
-            if process.poll() is not None:
+            # Only stop once the output is drained, lines can still be buffered after exit
+            if not output and process.poll() is not None:
                 break
                 
-        return success
+        # The recap line of one host can look fine while another host failed
+        return success and process.returncode == 0
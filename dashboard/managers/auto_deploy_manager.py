@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional
+
+from .config_manager import ConfigManager
+from .periodic_worker import PeriodicWorker
+
+
+class AutoDeployManager:
+    """Deploys services after their image is pushed, batching bursts of pushes into one Ansible run"""
+
+    def __init__(self, docker_manager, registry_manager, deploy_services: Callable[..., None]):
+        self.docker_manager = docker_manager
+        self.registry_manager = registry_manager
+        self.deploy_services = deploy_services
+        self.pending: Dict[str, Dict] = {}
+        self.first_requested_at: Optional[float] = None
+        self.last_requested_at: Optional[float] = None
+        self.deploying: List[str] = []
+        self.seen_digests: Dict[str, str] = {}
+        self.history: Deque[Dict] = deque(maxlen=50)
+        self._condition = threading.Condition()
+        self._stop_event = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._poller = PeriodicWorker(
+            'auto-deploy-poller', self.poll,
+            lambda: ConfigManager().get_auto_deploy_config().get('poll_interval_seconds', 60) or 60)
+
+    def start(self) -> None:
+        """Start the deploy worker and registry poller if auto deploy is enabled in config"""
+        settings = ConfigManager().get_auto_deploy_config()
+        if not settings.get('enabled', False):
+            return
+        self._stop_event.clear()
+        self._ensure_worker()
+        if settings.get('poll_interval_seconds', 60):
+            self._poller.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._poller.stop()
+        with self._condition:
+            self._condition.notify_all()
+
+    def _ensure_worker(self) -> None:
+        if not (self._worker and self._worker.is_alive()):
+            self._worker = threading.Thread(target=self._run, name='auto-deployer', daemon=True)
+            self._worker.start()
+
+    def is_enabled_for(self, service_name: str) -> bool:
+        config_manager = ConfigManager()
+        if not config_manager.get_auto_deploy_config().get('enabled', False):
+            return False
+        return config_manager.get_services_config().get(service_name, {}).get('auto_deploy', True) is not False
+
+    def request_deploy(self, service_name: str, source: str, digest: Optional[str] = None) -> Dict:
+        """Queue a deploy of service_name, merging it with other pending requests"""
+        now = time.time()
+        with self._condition:
+            entry = self.pending.setdefault(service_name, {'requests': 0, 'sources': [], 'first_requested_at': now})
+            entry['requests'] += 1
+            if source not in entry['sources']:
+                entry['sources'].append(source)
+            if digest:
+                entry['digest'] = digest
+                self.seen_digests[service_name] = digest
+            if self.first_requested_at is None:
+                self.first_requested_at = now
+            self.last_requested_at = now
+            self._condition.notify_all()
+            result = {'service': service_name, 'pending': sorted(self.pending), 'deploy_at': self._deploy_at()}
+        self._ensure_worker()
+        return result
+
+    def _deploy_at(self) -> Optional[str]:
+        due = self._due_time()
+        return datetime.fromtimestamp(due).isoformat() if due else None
+
+    def _due_time(self) -> Optional[float]:
+        if self.last_requested_at is None:
+            return None
+        settings = ConfigManager().get_auto_deploy_config()
+        return min(self.last_requested_at + settings.get('debounce_seconds', 10),
+                   self.first_requested_at + settings.get('max_delay_seconds', 60))
+
+    def _take_batch(self) -> Optional[Dict[str, Dict]]:
+        """Wait until the pending requests are due and take all of them"""
+        with self._condition:
+            while not self._stop_event.is_set():
+                due = self._due_time()
+                if due is None:
+                    self._condition.wait()
+                    continue
+                remaining = due - time.time()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+                batch = self.pending
+                self.pending = {}
+                self.first_requested_at = self.last_requested_at = None
+                self.deploying = sorted(batch)
+                return batch
+        return None
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            batch = self._take_batch()
+            if not batch:
+                return
+
+            names = sorted(batch)
+            event = {
+                'services': names,
+                'requests': sum(entry['requests'] for entry in batch.values()),
+                'sources': sorted({source for entry in batch.values() for source in entry['sources']}),
+                'started_at': datetime.now().isoformat(),
+            }
+            print(f"Auto deploying {', '.join(names)} ({event['requests']} requests)")
+            for name, entry in batch.items():
+                if 'digest' not in entry:
+                    # The deploy pulls whatever is latest now, let the next poll take that as its baseline
+                    self.seen_digests.pop(name, None)
+            started = time.time()
+            try:
+                self.deploy_services(*names)
+                event['success'] = True
+            except Exception as e:
+                print(f"Auto deploy error: {e}")
+                event['success'] = False
+                event['error'] = str(e)
+            event['duration_seconds'] = round(time.time() - started, 2)
+            self.deploying = []
+            self.history.append(event)
+
+    def poll(self, services: Optional[List[Dict]] = None) -> List[str]:
+        """Queue deploys for deployed services whose registry digest changed since the last poll"""
+        if services is None:
+            services = self.registry_manager.list_images()
+        deployed = self.docker_manager.get_container_nodes()
+
+        queued = []
+        for service in services:
+            digest = service.get('digest')
+            if not digest or service['name'] not in deployed:
+                continue
+            previous = self.seen_digests.get(service['name'])
+            self.seen_digests[service['name']] = digest
+            # The first poll only records digests, the running image may be current
+            if previous and previous != digest and self.is_enabled_for(service['name']):
+                self.request_deploy(service['name'], 'registry', digest)
+                queued.append(service['name'])
+        return queued
+
+    def get_status(self) -> Dict:
+        with self._condition:
+            pending = {name: dict(entry) for name, entry in self.pending.items()}
+            deploy_at = self._deploy_at()
+        return {
+            'enabled': ConfigManager().get_auto_deploy_config().get('enabled', False),
+            'pending': pending,
+            'deploy_at': deploy_at,
+            'deploying': list(self.deploying),
+            'history': list(self.history),
+        }
@@ -0,0 +1,158 @@
+import math
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from .config_manager import ConfigManager
+from .ansible_manager import AnsibleManager
+from .periodic_worker import PeriodicWorker
+
+
+class AutoscaleManager:
+    """Scales the replicas of services with an 'autoscale' section from their sustained CPU"""
+
+    def __init__(self, docker_manager, deploy_service: Callable[[str], None]):
+        self.docker_manager = docker_manager
+        self.deploy_service = deploy_service
+        self.samples: Dict[str, Deque[Tuple[float, float]]] = {}
+        self.last_scaled: Dict[str, float] = {}
+        self.events: Deque[Dict] = deque(maxlen=50)
+        self._worker = PeriodicWorker(
+            'autoscaler', self.evaluate,
+            lambda: ConfigManager().get_autoscaler_config().get('interval_seconds', 30), delay_first=True)
+
+    def start(self) -> None:
+        """Start the background loop if the autoscaler is enabled in config"""
+        if ConfigManager().get_autoscaler_config().get('enabled', False):
+            self._worker.start()
+
+    def stop(self) -> None:
+        self._worker.stop()
+
+    def _sample_cpu(self, services: Dict[str, int]) -> Dict[str, Optional[float]]:
+        """Average CPU percent across the running replicas of each service"""
+        containers = [(name, AnsibleManager.replica_name(name, i))
+                      for name, replicas in services.items() for i in range(replicas)]
+
+        def stats(container_name: str) -> Optional[float]:
+            try:
+                return self.docker_manager.get_container_stats(container_name)['cpu_percent']
+            except Exception:
+                return None
+
+        max_workers = ConfigManager().get_autoscaler_config().get('max_concurrent_stats', 8)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(stats, [container for _, container in containers]))
+
+        per_service: Dict[str, List[float]] = {name: [] for name in services}
+        for (name, _), cpu in zip(containers, results):
+            if cpu is not None:
+                per_service[name].append(cpu)
+        return {name: (sum(values) / len(values) if values else None) for name, values in per_service.items()}
+
+    @staticmethod
+    def decide(samples: List[Tuple[float, float]], replicas: int, settings: Dict, now: float,
+               interval: float) -> int:
+        """Get the desired replica count for a window of (timestamp, cpu_percent) samples"""
+        min_replicas = settings.get('min_replicas', 1)
+        max_replicas = settings.get('max_replicas', max(replicas, min_replicas))
+        target = settings.get('target_cpu_percent', 70)
+        scale_down_below = settings.get('scale_down_cpu_percent', target / 2)
+        sustain = settings.get('sustain_seconds', 300)
+
+        if replicas < min_replicas:
+            return min_replicas
+        if replicas > max_replicas:
+            return max_replicas
+
+        # Not enough history yet to call the load sustained
+        if not samples or now - samples[0][0] < sustain - interval:
+            return replicas
+
+        cpu_values = [cpu for _, cpu in samples]
+        average = sum(cpu_values) / len(cpu_values)
+
+        if min(cpu_values) > target:
+            return min(max_replicas, max(replicas + 1, math.ceil(replicas * average / target)))
+
+        if max(cpu_values) < scale_down_below and replicas > min_replicas:
+            # Only shrink if the remaining replicas can absorb the load
+            if average * replicas / (replicas - 1) < target:
+                return replicas - 1
+
+        return replicas
+
+    def evaluate(self) -> List[Dict]:
+        """Sample every autoscaled service once and apply scaling decisions"""
+        config_manager = ConfigManager()
+        autoscaler_config = config_manager.get_autoscaler_config()
+        interval = autoscaler_config.get('interval_seconds', 30)
+        cooldown = autoscaler_config.get('cooldown_seconds', 600)
+
+        autoscaled = {name: service for name, service in config_manager.get_services_config().items()
+                      if service.get('autoscale')}
+        replicas = {name: max(1, int(service.get('replicas', 1))) for name, service in autoscaled.items()}
+        cpu = self._sample_cpu(replicas)
+
+        now = time.time()
+        decisions = []
+        for name, service in autoscaled.items():
+            settings = service['autoscale']
+            window = self.samples.setdefault(name, deque())
+            if cpu[name] is not None:
+                window.append((now, cpu[name]))
+            while window and window[0][0] < now - settings.get('sustain_seconds', 300):
+                window.popleft()
+
+            if now - self.last_scaled.get(name, 0) < cooldown:
+                continue
+
+            desired = self.decide(list(window), replicas[name], settings, now, interval)
+            if desired == replicas[name]:
+                continue
+
+            event = {
+                'service': name,
+                'from': replicas[name],
+                'to': desired,
+                'cpu_percent': round(cpu[name], 2) if cpu[name] is not None else None,
+                'at': datetime.now().isoformat(),
+            }
+            print(f"Autoscaling {name} from {event['from']} to {event['to']} replicas")
+            # The deploy reads the replica count from config
+            config_manager.update_service_config(name, {'replicas': desired})
+            self.last_scaled[name] = now
+            window.clear()
+            try:
+                self.deploy_service(name)
+            except Exception as e:
+                print(f"Autoscaling {name} failed, keeping {replicas[name]} replicas: {e}")
+                config_manager.update_service_config(name, {'replicas': replicas[name]})
+                event['error'] = str(e)
+            self.events.append(event)
+            decisions.append(event)
+
+        return decisions
+
+    def get_status(self) -> Dict:
+        """Get autoscaling settings, recent CPU and scaling events per service"""
+        config_manager = ConfigManager()
+        services = {}
+        for name, service in config_manager.get_services_config().items():
+            if not service.get('autoscale'):
+                continue
+            window = self.samples.get(name, [])
+            services[name] = {
+                'replicas': service.get('replicas', 1),
+                'autoscale': service['autoscale'],
+                'recent_cpu_percent': round(window[-1][1], 2) if window else None,
+                'samples': len(window),
+            }
+        return {
+            'enabled': config_manager.get_autoscaler_config().get('enabled', False),
+            'running': self._worker.is_running(),
+            'services': services,
+            'events': list(self.events),
+        }
@@ -5,24 +5,100 @@ from typing import Dict, List, Tuple
 from .config_manager import ConfigManager
 from .ssh_manager import run_ssh_command
 
+# Encodings Caddy's encode directive supports out of the box
+SUPPORTED_ENCODINGS = ('zstd', 'gzip')
+# Options of reverse_proxy's http transport exposed per service
+TRANSPORT_DURATIONS = ('keepalive', 'dial_timeout', 'response_header_timeout', 'read_timeout', 'write_timeout')
+TRANSPORT_COUNTS = ('keepalive_idle_conns', 'keepalive_idle_conns_per_host', 'max_conns_per_host')
+DURATION_PATTERN = re.compile(r'\d+(ms|s|m|h)')
+# Cache paths are rendered into the Caddyfile as path matchers
+CACHE_PATH_PATTERN = re.compile(r'/[^\s{}"#]*')
+
 class CaddyManager:
     def __init__(self):
         self.caddy_dir = '/etc/caddy'
         self.conf_d_dir = f'{self.caddy_dir}/conf.d'
 
+    def _run_ssh_command(self, command: str) -> Tuple[bool, str, str]:
+        """Run a command on the ingress node, which is the one running Caddy"""
+        return run_ssh_command(command, node=ConfigManager().get_ingress_node())
+
+    @staticmethod
+    def normalize_performance_settings(settings: Dict) -> Dict:
+        """Validate per-service performance settings and drop empty values
+
+        Raises ValueError describing the first invalid setting.
+        """
+        if not isinstance(settings, dict):
+            raise ValueError("Performance settings must be an object")
+        normalized = {}
+
+        encode = settings.get('encode') or []
+        if not isinstance(encode, list):
+            raise ValueError("encode must be a list of encodings")
+        unsupported = [e for e in encode if e not in SUPPORTED_ENCODINGS]
+        if unsupported:
+            raise ValueError(f"Unsupported encodings: {', '.join(map(str, unsupported))}")
+        if encode:
+            # Keep Caddy's preference order regardless of input order
+            normalized['encode'] = [e for e in SUPPORTED_ENCODINGS if e in encode]
+
+        rules = settings.get('cache') or []
+        if not isinstance(rules, list):
+            raise ValueError("cache must be a list of rules")
+        cache = []
+        for rule in rules:
+            if not isinstance(rule, dict):
+                raise ValueError(f"Cache rule must be an object with a path and max_age: {rule!r}")
+            path = str(rule.get('path', '')).strip()
+            if not CACHE_PATH_PATTERN.fullmatch(path):
+                raise ValueError(f"Cache path must start with '/' and not contain spaces, braces, "
+                                 f"quotes or '#': {path!r}")
+            try:
+                max_age = int(rule.get('max_age'))
+            except (TypeError, ValueError):
+                raise ValueError(f"Cache max_age for {path} must be a number of seconds")
+            if max_age < 0:
+                raise ValueError(f"Cache max_age for {path} must not be negative")
+            cache.append({'path': path, 'max_age': max_age, 'public': bool(rule.get('public', True))})
+        if cache:
+            normalized['cache'] = cache
+
+        for key in TRANSPORT_DURATIONS:
+            value = str(settings.get(key) or '').strip()
+            if not value:
+                continue
+            if not (DURATION_PATTERN.fullmatch(value) or (key == 'keepalive' and value == 'off')):
+                raise ValueError(f"{key} must be a duration like 30s or 500ms: {value!r}")
+            normalized[key] = value
+
+        for key in TRANSPORT_COUNTS:
+            value = settings.get(key)
+            if value in (None, ''):
+                continue
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{key} must be a whole number: {value!r}")
+            if value < 0:
+                raise ValueError(f"{key} must not be negative")
+            normalized[key] = value
+
+        return normalized
+
     def get_main_config(self) -> Tuple[bool, str, str]:
         """Get the contents of the main Caddyfile"""
-        return run_ssh_command(f'cat {self.caddy_dir}/Caddyfile')
+        return self._run_ssh_command(f'cat {self.caddy_dir}/Caddyfile')
 
     def get_conf_d_files(self) -> Tuple[bool, List[str], str]:
         """Get list of files in conf.d directory"""
-        success, stdout, stderr = run_ssh_command(f'ls -1 {self.conf_d_dir}')
+        success, stdout, stderr = self._run_ssh_command(f'ls -1 {self.conf_d_dir}')
         files = stdout.strip().split('\n') if stdout.strip() else []
         return success, files, stderr
 
     def get_conf_d_file_content(self, filename: str) -> Tuple[bool, str, str]:
         """Get contents of a specific conf.d file"""
-        return run_ssh_command(f'cat {self.conf_d_dir}/{filename}')
+        return self._run_ssh_command(f'cat {self.conf_d_dir}/{filename}')
 
     def get_full_config(self, active_domains: set) -> Dict:
         """
@@ -1,12 +1,43 @@
 import json
 import os
+import re
+import tempfile
+import threading
 
 from .file_paths import file_paths
 
+# Names of services, as derived from their image name. Safe to use in shell commands.
+SERVICE_NAME_PATTERN = re.compile(r'[a-z0-9][a-z0-9._-]*')
+
+# Serializes read-modify-write cycles of config.json within the process
+_config_lock = threading.Lock()
+
+
+def write_json_atomic(path, data):
+    """Write data as JSON so that readers see either the old or the new file, never a partial one"""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
 
 class ConfigManager:
     def __init__(self):
-        self.config = self._load_config()
+        self._config = None
+        self._config_mtime = None
+
+    @property
+    def config(self):
+        """Parsed config.json, re-read whenever the file changes on disk"""
+        mtime = os.stat(file_paths['config_json']).st_mtime_ns
+        if mtime != self._config_mtime:
+            self._config = self._load_config()
+            self._config_mtime = mtime
+        return self._config
 
     def _load_config(self):
         with open(file_paths['config_json']) as f:
@@ -15,6 +46,18 @@ class ConfigManager:
     def get_raw_config(self):
         return self.config
 
+    def update_service_config(self, service_name, values):
+        """Merge values into services.<service_name> and write config.json"""
+        with _config_lock:
+            config = self._load_config()
+            config.setdefault('services', {}).setdefault(service_name, {}).update(values)
+            write_json_atomic(file_paths['config_json'], config)
+
+    def save_config(self, config):
+        """Replace config.json with config"""
+        with _config_lock:
+            write_json_atomic(file_paths['config_json'], config)
+
     def get_ssh_host_config(self):
         return self.config.get('ssh_host', {})
 
@@ -28,4 +71,59 @@ class ConfigManager:
         return self.config.get('caddy', {})
 
     def get_caddy_custom_directives(self):
-        return self.config.get('caddy', {}).get('custom_directives', [])
\ No newline at end of file
+        return self.config.get('caddy', {}).get('custom_directives', [])
+
+    def get_scheduler_config(self):
+        return self.config.get('scheduler', {})
+
+    def get_autoscaler_config(self):
+        return self.config.get('autoscaler', {})
+
+    def get_prefetch_config(self):
+        return self.config.get('prefetch', {})
+
+    def get_auto_deploy_config(self):
+        return self.config.get('auto_deploy', {})
+
+    def get_gc_config(self):
+        return self.config.get('gc', {})
+
+    def get_stats_history_config(self):
+        return self.config.get('stats_history', {})
+
+    def get_probes_config(self):
+        return self.config.get('probes', {})
+
+    def get_nodes_config(self):
+        """Get the node registry, falling back to a single node built from ssh_host
+
+        Nodes inherit connection settings they do not set from ssh_host. The
+        first node marked as ingress (or the first node) runs Caddy. With more
+        than one node every node must set private_address.
+        """
+        ssh_host_config = self.get_ssh_host_config()
+        nodes = self.config.get('nodes') or [{'name': 'api_server', 'ingress': True}]
+
+        normalized = []
+        for node in nodes:
+            # Services of other nodes are bound to and reached at this address, loopback would break them silently
+            if len(nodes) > 1 and not node.get('private_address'):
+                raise ValueError(f"Node {node['name']} needs a private_address when more than one node is configured")
+            normalized.append({
+                'name': node['name'],
+                'endpoint': node.get('endpoint', ssh_host_config.get('endpoint')),
+                'username': node.get('username', ssh_host_config.get('username')),
+                'password': node.get('password', ssh_host_config.get('password')),
+                'docker_port': node.get('docker_port', ssh_host_config.get('docker_port', 2376)),
+                'private_address': node.get('private_address', '127.0.0.1'),
+                'cpus': node.get('cpus'),
+                'memory_mb': node.get('memory_mb'),
+                'ingress': node.get('ingress', False),
+            })
+
+        if not any(node['ingress'] for node in normalized):
+            normalized[0]['ingress'] = True
+        return normalized
+
+    def get_ingress_node(self):
+        return next(node for node in self.get_nodes_config() if node['ingress'])
\ No newline at end of file
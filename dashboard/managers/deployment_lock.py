@@ -0,0 +1,36 @@
+import fcntl
+import threading
+from typing import IO, Optional
+
+from .file_paths import file_paths
+
+
+class DeploymentLock:
+    """Serializes deployments across threads and processes, they share the inventory and vars files"""
+
+    def __init__(self, path: str = file_paths['deployment_lock']):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._file: Optional[IO] = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if not self._thread_lock.acquire(blocking):
+            return False
+        lock_file = open(self.path, 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BaseException as e:
+            lock_file.close()
+            self._thread_lock.release()
+            if isinstance(e, BlockingIOError):
+                return False
+            raise
+        self._file = lock_file
+        return True
+
+    def release(self) -> None:
+        lock_file, self._file = self._file, None
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+        self._thread_lock.release()
+
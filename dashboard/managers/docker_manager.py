@@ -1,21 +1,144 @@
+import base64
 import docker
+import json
 import os
-from docker.errors import DockerException
-from typing import Optional, Dict
+import threading
+import time
+from docker.errors import NotFound
+from docker.models.containers import Container
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from typing import Optional, Dict, List, Tuple
 from datetime import datetime
 
 from .file_paths import file_paths
 from .config_manager import ConfigManager
 
 class DockerManager:
-    def __init__(self):
+    """Docker clients for every node, connected in the background
+
+    Constructing the manager does no network I/O. A connector thread, started
+    by start() or on first use of clients, connects to each node and pings
+    connected nodes every health_check_seconds. A node that cannot be reached
+    is retried with exponential backoff, from reconnect_base_seconds up to
+    reconnect_max_seconds, so the dashboard recovers from network blips
+    without a restart.
+    """
+
+    def __init__(self, reconnect_base_seconds: float = 1.0, reconnect_max_seconds: float = 60.0,
+                 health_check_seconds: float = 30.0):
         self.config_manager = ConfigManager()
-        self.client = self._setup_docker_client()
-    
-    def _setup_docker_client(self) -> Optional[docker.DockerClient]:
-        """Setup Docker client with TLS if configured"""
-        ssh_host_config = self.config_manager.get_ssh_host_config()
-        docker_host = f"tcp://{ssh_host_config.get('endpoint')}:2376"
+        self.reconnect_base_seconds = reconnect_base_seconds
+        self.reconnect_max_seconds = reconnect_max_seconds
+        self.health_check_seconds = health_check_seconds
+        self._clients: Dict[str, docker.DockerClient] = {}
+        self.health: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._connected = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def nodes(self) -> List[Dict]:
+        return self.config_manager.get_nodes_config()
+
+    @property
+    def clients(self) -> Dict[str, docker.DockerClient]:
+        """Clients of the nodes that are currently connected"""
+        self.start()
+        with self._lock:
+            return dict(self._clients)
+
+    @property
+    def client(self) -> Optional[docker.DockerClient]:
+        """Docker client for the ingress node"""
+        return self.clients.get(self.config_manager.get_ingress_node()['name'])
+
+    def start(self) -> None:
+        """Start connecting to the nodes in the background"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._connect_loop, name='docker-connector', daemon=True)
+            self._thread.start()
+
+    def wait_until_connected(self, timeout: float = 30.0) -> bool:
+        """Block until every node had a first connection attempt, returning whether the ingress node is up"""
+        self.start()
+        node_names = {node['name'] for node in self.nodes}
+        deadline = time.time() + timeout
+        with self._connected:
+            while not all(self.health.get(name, {}).get('attempts') or name in self._clients
+                          for name in node_names):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._connected.wait(remaining)
+        return self.client is not None
+
+    def get_health(self) -> Dict[str, Dict]:
+        """Connection state of every node"""
+        with self._lock:
+            return {name: dict(state) for name, state in self.health.items()}
+
+    def _set_health(self, node_name: str, **values) -> None:
+        state = self.health.setdefault(node_name, {'state': 'connecting', 'attempts': 0, 'error': None,
+                                                   'connected_since': None, 'next_attempt_at': None})
+        state.update(values)
+
+    def _connect_loop(self) -> None:
+        next_attempt: Dict[str, float] = {}
+        next_check: Dict[str, float] = {}
+        while True:
+            now = time.time()
+            for node in self.nodes:
+                name = node['name']
+                with self._lock:
+                    client = self._clients.get(name)
+                    if name not in self.health:
+                        self._set_health(name)
+
+                if client is None and next_attempt.get(name, 0) <= now:
+                    client = self._setup_docker_client(node)
+                    with self._connected:
+                        if client:
+                            self._clients[name] = client
+                            self._set_health(name, state='connected', attempts=0, error=None,
+                                             connected_since=datetime.now().isoformat(), next_attempt_at=None)
+                            next_check[name] = now + self.health_check_seconds
+                        else:
+                            attempts = self.health[name]['attempts'] + 1
+                            delay = min(self.reconnect_max_seconds, self.reconnect_base_seconds * 2 ** (attempts - 1))
+                            next_attempt[name] = now + delay
+                            self._set_health(name, state='disconnected', attempts=attempts,
+                                             next_attempt_at=datetime.fromtimestamp(next_attempt[name]).isoformat())
+                            if attempts == 1:
+                                print(f"Docker not available on node {name}: {self.health[name]['error']}")
+                        self._connected.notify_all()
+                elif client is not None and next_check.get(name, 0) <= now:
+                    try:
+                        client.ping()
+                        next_check[name] = now + self.health_check_seconds
+                    except Exception as e:
+                        self._node_failed(name, e)
+                        next_attempt[name] = now
+
+            # Sleep until the next reconnect or health check is due, or a failure is reported
+            due = [t for t in list(next_attempt.values()) + list(next_check.values()) if t > now]
+            self._wake.wait(max(0.05, min(due, default=now + 1) - time.time()))
+            self._wake.clear()
+
+    def _node_failed(self, node_name: str, error: Exception) -> None:
+        """Drop the client of a node that stopped answering and reconnect in the background"""
+        with self._lock:
+            if self._clients.pop(node_name, None) is None:
+                return
+            print(f"Lost connection to Docker on node {node_name}: {error}")
+            self._set_health(node_name, state='disconnected', attempts=0, error=str(error), connected_since=None)
+        self._wake.set()
+
+    def _setup_docker_client(self, node: Dict) -> Optional[docker.DockerClient]:
+        """Setup Docker client for a node with TLS if configured"""
+        docker_host = f"tcp://{node.get('endpoint')}:{node.get('docker_port', 2376)}"
         
         # Check multiple possible certificate locations
         cert_locations = [
@@ -32,7 +155,8 @@ class DockerManager:
             ca_path = os.path.join(docker_cert_path, 'ca.pem')
             
             if not all(os.path.exists(p) for p in [client_cert_path, client_key_path, ca_path]):
-                print(f"Warning: Missing certificates in {docker_cert_path}")
+                with self._lock:
+                    self._set_health(node['name'], error=f"Missing certificates in {docker_cert_path}")
                 return None
                 
             docker_kwargs = {
@@ -50,16 +174,108 @@ class DockerManager:
             client = docker.DockerClient(**docker_kwargs)
             client.ping()
             return client
-        except DockerException as e:
-            print(f"Docker not available: {e}")
+        except Exception as e:
+            with self._lock:
+                self._set_health(node['name'], error=str(e))
             return None
 
+    def list_containers(self) -> List[Tuple[str, Container]]:
+        """List all containers on every reachable node as (node_name, container)"""
+        containers = []
+        for node_name, client in self.clients.items():
+            try:
+                containers.extend((node_name, container) for container in client.containers.list(all=True))
+            except RequestsConnectionError as e:
+                self._node_failed(node_name, e)
+        return containers
+
+    def get_container_nodes(self) -> Dict[str, str]:
+        """Map container name to the node it runs on"""
+        # Container summaries carry the names, so this avoids one inspect per container
+        container_nodes = {}
+        for node_name, client in self.clients.items():
+            try:
+                summaries = client.api.containers(all=True)
+            except RequestsConnectionError as e:
+                self._node_failed(node_name, e)
+                continue
+            for summary in summaries:
+                container_nodes[summary['Names'][0].lstrip('/')] = node_name
+        return container_nodes
+
+    def has_image_digest(self, node_name: str, image: str, digest: Optional[str]) -> bool:
+        """Check whether a node already holds image at the given registry manifest digest"""
+        client = self.clients.get(node_name)
+        if not client or not digest:
+            return False
+        try:
+            local_image = client.images.get(image)
+        except NotFound:
+            return False
+        return any(repo_digest.endswith(f'@{digest}') for repo_digest in local_image.attrs.get('RepoDigests', []))
+
+    def _get_registry_auth(self, image: str) -> Optional[Dict[str, str]]:
+        """Get credentials for the image's registry from docker-config.json"""
+        registry = image.split('/')[0]
+        try:
+            with open(file_paths['docker_config']) as f:
+                auth = json.load(f).get('auths', {}).get(registry, {}).get('auth')
+        except (OSError, ValueError):
+            return None
+        if not auth:
+            return None
+        username, _, password = base64.b64decode(auth).decode().partition(':')
+        return {'username': username, 'password': password}
+
+    def pull_image(self, node_name: str, image: str) -> str:
+        """Pull an image onto a node and return its image id"""
+        client = self.clients.get(node_name)
+        if not client:
+            raise Exception(f'Docker not available on node {node_name}')
+        repository, _, tag = image.rpartition(':')
+        pulled = client.images.pull(repository, tag=tag, auth_config=self._get_registry_auth(image))
+        return pulled.id
+
+    def get_disk_usage(self, node_name: str) -> Dict:
+        """Get image, container and layer sizes of a node (docker system df)"""
+        client = self.clients.get(node_name)
+        if not client:
+            raise Exception(f'Docker not available on node {node_name}')
+        return client.df()
+
+    def remove_image(self, node_name: str, image_id: str) -> None:
+        """Remove an image from a node, failing if a container still uses it"""
+        client = self.clients.get(node_name)
+        if not client:
+            raise Exception(f'Docker not available on node {node_name}')
+        client.images.remove(image_id, force=False, noprune=False)
+
+    def get_node_container(self, node_name: str, container_id: str) -> Container:
+        """Get a container by id on a node"""
+        client = self.clients.get(node_name)
+        if not client:
+            raise Exception(f'Docker not available on node {node_name}')
+        return client.containers.get(container_id)
+
+    def remove_container(self, node_name: str, container_id: str) -> None:
+        """Remove a stopped container from a node, failing if it is running"""
+        self.get_node_container(node_name, container_id).remove(force=False)
+
+    def _get_container(self, name: str) -> Container:
+        """Find a container by name on any node"""
+        if not self.clients:
+            raise Exception('Docker not available')
+
+        for client in self.clients.values():
+            try:
+                return client.containers.get(name)
+            except NotFound:
+                continue
+        raise NotFound(f'No such container: {name}')
+
     def get_container_logs(self, name: str) -> Dict:
         """Get container status"""
-        if not self.client:
-            raise Exception('Docker not available')
-            
-        container = self.client.containers.get(name)
+        container = self._get_container(name)
         status = container.status
         logs = container.logs(tail=100, timestamps=True).decode('utf-8')
         
@@ -75,10 +291,7 @@ class DockerManager:
     
     def get_container_stats(self, name: str) -> Dict:
         """Get container statistics"""
-        if not self.client:
-            raise Exception('Docker not available')
-            
-        container = self.client.containers.get(name)
+        container = self._get_container(name)
         if container.status != 'running':
             raise Exception('Container not running')
             
@@ -117,26 +330,17 @@ class DockerManager:
 
     def container_restart(self, name: str) -> None:
         """Restart a container"""
-        if not self.client:
-            raise Exception('Docker not available')
-            
-        container = self.client.containers.get(name)
+        container = self._get_container(name)
         container.restart()
 
     def container_shutdown(self, name: str) -> None:
         """Shutdown a container"""
-        if not self.client:
-            raise Exception('Docker not available')
-            
-        container = self.client.containers.get(name)
+        container = self._get_container(name)
         container.stop()
 
     def container_delete(self, name: str) -> None:
         """Delete a container"""
-        if not self.client:
-            raise Exception('Docker not available')
-            
-        container = self.client.containers.get(name)
+        container = self._get_container(name)
         if container.status == 'running':
             container.stop()
         container.remove()
@@ -1,5 +1,5 @@
 import subprocess
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from .config_manager import ConfigManager
 
@@ -32,8 +32,13 @@ class RegistryManager:
                     tags = []
                     for line in tags_result.stdout.strip().split('\n')[1:]:
                         if line.strip():
-                            tag_name = line.split()[0]
-                            tags.append({'tag': tag_name})
+                            # Columns: Tag, Compressed Size (value and unit), Updated At, Manifest Digest
+                            columns = line.split()
+                            tags.append({
+                                'tag': columns[0],
+                                'compressed_size': self._parse_size(columns[1:3]),
+                                'digest': columns[-1] if columns[-1].startswith('sha256:') else None,
+                            })
                     
                     if tags:
                         tag = tags[0]['tag']
@@ -42,7 +47,9 @@ class RegistryManager:
                         services.append({
                             'name': name,
                             'image': image,
-                            'domain': f"{name}.{self.config_manager.get_caddy_config().get('base_domain')}"
+                            'domain': f"{name}.{self.config_manager.get_caddy_config().get('base_domain')}",
+                            'digest': tags[0]['digest'],
+                            'compressed_size': tags[0]['compressed_size']
                         })
                 except Exception as e:
                     print(f"Error getting tags for repository {repo['name']}: {e}")
@@ -53,6 +60,15 @@ class RegistryManager:
             print(f"Error listing registry images: {e}")
             return []
 
+    @staticmethod
+    def _parse_size(columns: List[str]) -> Optional[int]:
+        """Parse a doctl size like ['25.00', 'MB'] into bytes"""
+        units = {'B': 1, 'kB': 1000, 'KB': 1000, 'MB': 1000 ** 2, 'GB': 1000 ** 3}
+        try:
+            return int(float(columns[0]) * units[columns[1]])
+        except (IndexError, KeyError, ValueError):
+            return None
+
     def get_image(self, name: str) -> Dict[str, str]:
         """Get an image from the registry by name"""
         services = self.list_images()
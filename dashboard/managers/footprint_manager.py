@@ -0,0 +1,190 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from .config_manager import ConfigManager
+from .periodic_worker import PeriodicWorker
+from .ssh_manager import run_ssh_command
+
+
+class FootprintManager:
+    """Reports disk usage of images, containers and volumes and prunes old images"""
+
+    def __init__(self, docker_manager):
+        self.docker_manager = docker_manager
+        self.last_run: Optional[Dict] = None
+        self._lock = threading.Lock()
+        self._worker = PeriodicWorker(
+            'image-gc', lambda: self.collect(dry_run=False),
+            lambda: ConfigManager().get_gc_config().get('interval_seconds', 86400), delay_first=True)
+
+    def start(self) -> None:
+        """Start scheduled garbage collection if it is enabled in config"""
+        if ConfigManager().get_gc_config().get('enabled', False):
+            self._worker.start()
+
+    def stop(self) -> None:
+        self._worker.stop()
+
+    def _service_for_reference(self, reference: str) -> Optional[str]:
+        """Map registry/namespace/<service>:tag or @digest to the service name"""
+        registry = ConfigManager().get_registry_config()
+        prefix = f"{registry.get('url')}/{registry.get('namespace')}/"
+        if '@' in reference:
+            repository = reference.partition('@')[0]
+        else:
+            repository = reference.rpartition(':')[0]
+        if not repository.startswith(prefix):
+            return None
+        return repository[len(prefix):]
+
+    def _get_volume_sizes(self, node: Dict) -> List[Dict]:
+        """Sizes of the service directories under filesystem.host_path"""
+        host_path = ConfigManager().get_raw_config().get('filesystem', {}).get('host_path')
+        if not host_path:
+            return []
+        success, stdout, _ = run_ssh_command(f'sudo du -sb {host_path}/* 2>/dev/null', node=node)
+        volumes = []
+        for line in stdout.splitlines():
+            size, _, path = line.partition('\t')
+            if size.isdigit():
+                volumes.append({'service': path.rstrip('/').split('/')[-1], 'path': path, 'size': int(size)})
+        return volumes
+
+    def _node_footprint(self, node: Dict) -> Dict:
+        usage = self.docker_manager.get_disk_usage(node['name'])
+
+        images = []
+        for image in usage.get('Images') or []:
+            tags = [tag for tag in image.get('RepoTags') or [] if tag != '<none>:<none>']
+            # Old versions lose their tag to the newer pull but keep their repo digest
+            references = tags + (image.get('RepoDigests') or [])
+            services = {self._service_for_reference(reference) for reference in references} - {None}
+            # Docker reports -1 when it did not compute shared sizes
+            shared_size = min(max(image.get('SharedSize', 0), 0), image['Size'])
+            images.append({
+                'id': image['Id'],
+                'tags': tags,
+                'service': services.pop() if services else None,
+                'created': datetime.fromtimestamp(image['Created'], timezone.utc).isoformat(),
+                'size': image['Size'],
+                'shared_size': shared_size,
+                'unique_size': image['Size'] - shared_size,
+                'containers': max(image.get('Containers', 0), 0),
+                'dangling': not tags,
+            })
+        images.sort(key=lambda i: i['created'], reverse=True)
+
+        containers = [{
+            'id': container['Id'],
+            'name': container['Names'][0].lstrip('/'),
+            'image_id': container['ImageID'],
+            'state': container['State'],
+            'status': container.get('Status'),
+            'size': container.get('SizeRw', 0),
+        } for container in usage.get('Containers') or []]
+
+        return {
+            'node': node['name'],
+            'layers_size': usage.get('LayersSize', 0),
+            'images': images,
+            'dangling_images': [image for image in images if image['dangling']],
+            'stopped_containers': [c for c in containers if c['state'] != 'running'],
+            'containers': containers,
+            'volumes': self._get_volume_sizes(node),
+        }
+
+    def get_footprint(self) -> Dict:
+        """Disk usage per node, with totals across the fleet"""
+        nodes = [self._node_footprint(node) for node in ConfigManager().get_nodes_config()
+                 if node['name'] in self.docker_manager.clients]
+        return {
+            'nodes': nodes,
+            'totals': {
+                'images': sum(node['layers_size'] for node in nodes),
+                'dangling_images': sum(i['unique_size'] for node in nodes for i in node['dangling_images']),
+                'stopped_containers': sum(c['size'] for node in nodes for c in node['stopped_containers']),
+                'volumes': sum(v['size'] for node in nodes for v in node['volumes']),
+            },
+        }
+
+    def _stopped_long_enough(self, node_name: str, container_id: str, max_age_hours: float) -> bool:
+        try:
+            state = self.docker_manager.get_node_container(node_name, container_id).attrs['State']
+            finished_at = datetime.fromisoformat(state['FinishedAt'][:19]).replace(tzinfo=timezone.utc)
+        except Exception:
+            return False
+        # Containers that never ran report a zero FinishedAt
+        if state.get('Running') or finished_at.year < 2000:
+            return False
+        return datetime.now(timezone.utc) - finished_at > timedelta(hours=max_age_hours)
+
+    def plan(self, footprint: Optional[Dict] = None) -> Dict:
+        """Work out what garbage collection would remove, without removing anything"""
+        settings = ConfigManager().get_gc_config()
+        keep_images = max(1, int(settings.get('keep_images', 3)))
+        max_age_hours = settings.get('stopped_container_max_age_hours')
+        footprint = footprint or self.get_footprint()
+
+        actions = []
+        for node in footprint['nodes']:
+            containers = [c for c in node['stopped_containers']
+                          if max_age_hours is not None and self._stopped_long_enough(node['node'], c['id'], max_age_hours)]
+            for container in containers:
+                actions.append({'type': 'container', 'node': node['node'], 'id': container['id'],
+                                'name': container['name'], 'size': container['size'],
+                                'reason': f'stopped for more than {max_age_hours} hours'})
+
+            removed_containers = {c['id'] for c in containers}
+            images_in_use = {c['image_id'] for c in node['containers'] if c['id'] not in removed_containers}
+
+            kept_per_service: Dict[str, int] = {}
+            for image in node['images']:  # newest first
+                if image['id'] in images_in_use:
+                    if image['service']:
+                        kept_per_service[image['service']] = kept_per_service.get(image['service'], 0) + 1
+                    continue
+                reason = None
+                if image['service']:
+                    kept = kept_per_service.get(image['service'], 0)
+                    if kept >= keep_images:
+                        reason = f"older than the {keep_images} most recent images of {image['service']}"
+                    else:
+                        kept_per_service[image['service']] = kept + 1
+                elif image['dangling'] and settings.get('remove_dangling', True):
+                    reason = 'dangling'
+                if reason:
+                    actions.append({'type': 'image', 'node': node['node'], 'id': image['id'],
+                                    'name': ', '.join(image['tags']) or image['id'][7:19],
+                                    'size': image['unique_size'], 'reason': reason})
+
+        return {
+            'actions': actions,
+            'reclaimable': sum(action['size'] for action in actions),
+        }
+
+    def collect(self, dry_run: bool = True) -> Dict:
+        """Run garbage collection, or only preview it when dry_run is set"""
+        with self._lock:
+            result = self.plan()
+            result.update(dry_run=dry_run, at=datetime.now().isoformat())
+            if dry_run:
+                return result
+
+            # Containers first so the images they used become removable
+            for action in sorted(result['actions'], key=lambda a: a['type'] != 'container'):
+                try:
+                    if action['type'] == 'container':
+                        self.docker_manager.remove_container(action['node'], action['id'])
+                    else:
+                        self.docker_manager.remove_image(action['node'], action['id'])
+                    action['removed'] = True
+                except Exception as e:
+                    action['removed'] = False
+                    action['error'] = str(e)
+
+            result['reclaimed'] = sum(a['size'] for a in result['actions'] if a['removed'])
+            print(f"Image GC removed {sum(a['removed'] for a in result['actions'])} items, "
+                  f"reclaimed {result['reclaimed'] / 1_000_000:.1f} MB")
+            self.last_run = result
+            return result
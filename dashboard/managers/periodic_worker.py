@@ -0,0 +1,43 @@
+import threading
+from typing import Callable, Optional
+
+
+class PeriodicWorker:
+    """Calls task on a daemon thread every interval() seconds until stopped"""
+
+    def __init__(self, name: str, task: Callable[[], object], interval: Callable[[], float],
+                 delay_first: bool = False):
+        self.name = name
+        self.task = task
+        self.interval = interval
+        self.delay_first = delay_first
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.is_running():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def is_running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def wait(self, seconds: float) -> bool:
+        """Sleep up to seconds, returning True if the worker was stopped meanwhile"""
+        return self._stop_event.wait(seconds)
+
+    def _run(self) -> None:
+        if self.delay_first and self.wait(self.interval()):
+            return
+        while True:
+            try:
+                self.task()
+            except Exception as e:
+                print(f"Error in {self.name}: {e}")
+            if self.wait(self.interval()):
+                return
@@ -0,0 +1,92 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .config_manager import ConfigManager
+from .periodic_worker import PeriodicWorker
+
+
+class PrefetchManager:
+    """Pulls new registry images onto the nodes running them so deploys only recreate containers"""
+
+    def __init__(self, docker_manager, registry_manager):
+        self.docker_manager = docker_manager
+        self.registry_manager = registry_manager
+        self.states: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._bandwidth_lock = threading.Lock()
+        self._next_pull_at = 0.0
+        self._worker = PeriodicWorker(
+            'prefetcher', self.check, lambda: ConfigManager().get_prefetch_config().get('interval_seconds', 120))
+
+    def start(self) -> None:
+        """Start the background loop if prefetching is enabled in config"""
+        if ConfigManager().get_prefetch_config().get('enabled', False):
+            self._worker.start()
+
+    def stop(self) -> None:
+        self._worker.stop()
+
+    def _set_state(self, service_name: str, **values) -> None:
+        with self._lock:
+            state = self.states.setdefault(service_name, {})
+            state.update(values, updated_at=datetime.now().isoformat())
+
+    def _wait_for_bandwidth(self, size_bytes: Optional[int]) -> None:
+        """Delay the next pull so the average rate stays under max_mbps, the Docker API cannot throttle a pull"""
+        max_mbps = ConfigManager().get_prefetch_config().get('max_mbps')
+        if not max_mbps or not size_bytes:
+            return
+        with self._bandwidth_lock:
+            start = max(time.time(), self._next_pull_at)
+            self._next_pull_at = start + size_bytes * 8 / (max_mbps * 1_000_000)
+        delay = start - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _pull(self, service: Dict, node_name: str) -> None:
+        self._wait_for_bandwidth(service.get('compressed_size'))
+        self._set_state(service['name'], state='pulling', digest=service['digest'], node=node_name, error=None)
+        started = time.time()
+        try:
+            image_id = self.docker_manager.pull_image(node_name, service['image'])
+            self._set_state(service['name'], state='ready', image_id=image_id,
+                            pull_seconds=round(time.time() - started, 2))
+        except Exception as e:
+            self._set_state(service['name'], state='failed', error=str(e))
+
+    def check(self, services: Optional[List[Dict]] = None) -> List[str]:
+        """Pull images whose registry digest is not on the node yet, returning the pulled services"""
+        if services is None:
+            services = self.registry_manager.list_images()
+        container_nodes = self.docker_manager.get_container_nodes()
+
+        to_pull = []
+        for service in services:
+            node_name = container_nodes.get(service['name'])
+            if not node_name or not service.get('digest'):
+                continue  # only prefetch for services that are deployed
+
+            current = self.states.get(service['name'], {})
+            if current.get('state') == 'pulling':
+                continue
+            if self.docker_manager.has_image_digest(node_name, service['image'], service['digest']):
+                if current.get('digest') != service['digest']:
+                    self._set_state(service['name'], state='ready', digest=service['digest'], node=node_name,
+                                    error=None)
+                continue
+            to_pull.append((service, node_name))
+
+        if to_pull:
+            max_concurrent = ConfigManager().get_prefetch_config().get('max_concurrent', 2)
+            with ThreadPoolExecutor(max_workers=max_concurrent) as executor:
+                for service, node_name in to_pull:
+                    executor.submit(self._pull, service, node_name)
+
+        return [service['name'] for service, _ in to_pull]
+
+    def get_states(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: dict(state) for name, state in self.states.items()}
@@ -0,0 +1,253 @@
+import random
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Dict, List, Optional, Tuple
+
+from .ansible_manager import AnsibleManager
+from .config_manager import ConfigManager
+from .periodic_worker import PeriodicWorker
+from .quantile_sketch import QuantileSketch
+from .ssh_manager import run_ssh_command
+
+
+class _ProbeBucket:
+    """Probe results of one service and path within one bucket interval"""
+
+    def __init__(self, start: float):
+        self.start = start
+        self.count = 0
+        self.failures = 0
+        self.latency = QuantileSketch()
+
+
+class ProbeManager:
+    """Probes every deployed service's health endpoint through Caddy and directly on its node"""
+
+    def __init__(self, docker_manager, ansible_manager: AnsibleManager, bucket_seconds: int = 60,
+                 retention_seconds: int = 3600, targets_refresh_seconds: int = 300):
+        self.docker_manager = docker_manager
+        self.ansible_manager = ansible_manager
+        self.bucket_seconds = bucket_seconds
+        self.retention_seconds = retention_seconds
+        self.targets_refresh_seconds = targets_refresh_seconds
+        self.buckets: Dict[Tuple[str, str], Deque[_ProbeBucket]] = {}
+        self.last_results: Dict[Tuple[str, str], Dict] = {}
+        self.consecutive_failures: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self._worker = PeriodicWorker('prober', self.probe_all, self._round_interval)
+
+    def start(self) -> None:
+        """Start probing in the background if it is enabled in config"""
+        if ConfigManager().get_probes_config().get('enabled', False):
+            self._worker.start()
+
+    def stop(self) -> None:
+        self._worker.stop()
+
+    @staticmethod
+    def _round_interval() -> float:
+        settings = ConfigManager().get_probes_config()
+        jitter = settings.get('jitter_seconds', 5)
+        return max(1.0, settings.get('interval_seconds', 30) + random.uniform(-jitter, jitter))
+
+    def _targets(self) -> List[Dict]:
+        """Deployed services with the node and port of every replica"""
+        # Reading them takes SSH round trips, so they are refreshed far less often than probes run
+        port_offsets = self.ansible_manager.get_port_offsets(self.targets_refresh_seconds)
+
+        config_manager = ConfigManager()
+        services_config = config_manager.get_services_config()
+        base_domain = config_manager.get_caddy_config().get('base_domain')
+        container_nodes = self.docker_manager.get_container_nodes()
+
+        targets = []
+        for name, offsets in port_offsets.items():
+            replicas = []
+            for i, offset in enumerate(offsets):
+                node_name = container_nodes.get(AnsibleManager.replica_name(name, i))
+                if node_name:
+                    replicas.append({'index': i, 'node': node_name, 'port': 3000 + offset})
+            if not replicas:
+                continue
+            targets.append({
+                'name': name,
+                'domain': f'{name}.{base_domain}',
+                'health_path': services_config.get(name, {}).get('health_path', '/health'),
+                'replicas': replicas,
+            })
+        return targets
+
+    def _probe_public(self, target: Dict, timeout: float) -> None:
+        url = f"https://{target['domain']}{target['health_path']}"
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                response.read(1024)
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except Exception as e:
+            self._record(target['name'], 'public', False, None, str(e))
+            return
+        latency_ms = (time.perf_counter() - started) * 1000
+        self._record(target['name'], 'public', 200 <= status < 400, latency_ms,
+                     None if 200 <= status < 400 else f'HTTP {status}')
+
+    def _probe_direct(self, node: Dict, targets: List[Tuple[str, int, str]], timeout: float,
+                      max_concurrent: int) -> None:
+        """Curl every replica on a node in one SSH round trip, max_concurrent at a time"""
+        address = '127.0.0.1' if node['ingress'] else node['private_address']
+        commands = [f"curl -s -o /dev/null -m {timeout} -w '{name} %{{http_code}} %{{time_total}}\\n' "
+                    f"http://{address}:{port}{path} &" for name, port, path in targets]
+        batches = [' '.join(commands[i:i + max_concurrent]) + ' wait'
+                   for i in range(0, len(commands), max_concurrent)]
+        # Batches run one after another, each bounded by curl's own timeout
+        ssh_timeout = timeout * (len(batches) + 1) + 5
+        try:
+            success, stdout, stderr = run_ssh_command('; '.join(batches), node=node, timeout=ssh_timeout)
+        except subprocess.TimeoutExpired:
+            for name in {name for name, _, _ in targets}:
+                self._record(name, 'direct', False, None, f"SSH to {node['name']} timed out after {ssh_timeout}s",
+                             timed_out=True)
+            return
+
+        seen = set()
+        for line in stdout.splitlines():
+            parts = line.split()
+            if len(parts) != 3:
+                continue
+            name, code, seconds = parts[0], int(parts[1]), float(parts[2])
+            seen.add(name)
+            ok = 200 <= code < 400
+            error = None if ok else ('timeout or connection failure' if code == 0 else f'HTTP {code}')
+            self._record(name, 'direct', ok, seconds * 1000 if code else None, error)
+        for name, _, _ in targets:
+            if name not in seen:
+                self._record(name, 'direct', False, None, stderr.strip() or 'no response from node')
+
+    def probe_all(self) -> List[str]:
+        """Probe every deployed service once, returning the names probed"""
+        settings = ConfigManager().get_probes_config()
+        timeout = settings.get('timeout_seconds', 5)
+        jitter = settings.get('jitter_seconds', 5)
+        max_concurrent = settings.get('max_concurrent', 8)
+        targets = self._targets()
+        nodes = {node['name']: node for node in ConfigManager().get_nodes_config()}
+
+        # Replicas are recorded under the service, each probe counts once
+        per_node: Dict[str, List[Tuple[str, int, str]]] = {}
+        for target in targets:
+            for replica in target['replicas']:
+                per_node.setdefault(replica['node'], []).append(
+                    (target['name'], replica['port'], target['health_path']))
+
+        with ThreadPoolExecutor(max_workers=max_concurrent) as executor:
+            for node_name, node_targets in per_node.items():
+                if node_name in nodes:
+                    executor.submit(self._probe_direct, nodes[node_name], node_targets, timeout, max_concurrent)
+
+            # Jitter is waited out here rather than in a worker, where it would hold a slot
+            started = time.monotonic()
+            delays = sorted(((random.uniform(0, jitter), target) for target in targets), key=lambda d: d[0])
+            for delay, target in delays:
+                if self._worker.wait(max(0.0, started + delay - time.monotonic())):
+                    break
+                executor.submit(self._probe_public, target, timeout)
+
+        return [target['name'] for target in targets]
+
+    def _record(self, service_name: str, path: str, ok: bool, latency_ms: Optional[float],
+                error: Optional[str], timed_out: bool = False) -> None:
+        now = time.time()
+        key = (service_name, path)
+        with self._lock:
+            buckets = self.buckets.setdefault(key, deque())
+            start = now - now % self.bucket_seconds
+            if not buckets or buckets[-1].start != start:
+                buckets.append(_ProbeBucket(start))
+            bucket = buckets[-1]
+            bucket.count += 1
+            if ok:
+                bucket.latency.add(latency_ms)
+            else:
+                bucket.failures += 1
+            while buckets and buckets[0].start < now - self.retention_seconds:
+                buckets.popleft()
+
+            self.consecutive_failures[key] = 0 if ok else self.consecutive_failures.get(key, 0) + 1
+            self.last_results[key] = {'ok': ok, 'at': now, 'error': error, 'timed_out': timed_out,
+                                      'latency_ms': round(latency_ms, 1) if latency_ms is not None else None}
+
+    def _path_summary(self, key: Tuple[str, str], window_seconds: int) -> Optional[Dict]:
+        if key not in self.last_results:
+            return None
+        cutoff = time.time() - window_seconds
+        latency = QuantileSketch()
+        count = failures = 0
+        for bucket in self.buckets.get(key, []):
+            if bucket.start + self.bucket_seconds <= cutoff:
+                continue
+            count += bucket.count
+            failures += bucket.failures
+            latency.merge(bucket.latency)
+
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value, 1) if value is not None else None
+
+        return {
+            'probes': count,
+            'availability': round((count - failures) / count, 4) if count else None,
+            'p50_ms': ms(latency.quantile(0.50)),
+            'p95_ms': ms(latency.quantile(0.95)),
+            'p99_ms': ms(latency.quantile(0.99)),
+            'consecutive_failures': self.consecutive_failures.get(key, 0),
+            'last': self.last_results[key],
+        }
+
+    def get_summary(self, service_name: str, window_seconds: int = 900) -> Optional[Dict]:
+        """Availability and latency of both probe paths, with an overall state
+
+        A service is 'down' when its last three probes on a path failed or
+        the last one timed out reaching the node, and
+        'degraded' when a path's availability or p95 latency misses the
+        configured thresholds or its last probe failed.
+        """
+        settings = ConfigManager().get_probes_config()
+        with self._lock:
+            paths = {path: self._path_summary((service_name, path), window_seconds)
+                     for path in ('public', 'direct')}
+        paths = {path: summary for path, summary in paths.items() if summary}
+        if not paths:
+            return None
+
+        state = 'healthy'
+        reasons = []
+        for path, summary in paths.items():
+            if summary['consecutive_failures'] >= 3 or summary['last']['timed_out']:
+                state = 'down'
+                reasons.append(summary['last']['error'] if summary['last']['timed_out'] else
+                               f"{path} probe failed {summary['consecutive_failures']} times in a row")
+                continue
+            if not summary['last']['ok']:
+                reasons.append(f"last {path} probe failed: {summary['last']['error']}")
+            if summary['availability'] is not None and \
+                    summary['availability'] < settings.get('degraded_availability', 0.99):
+                reasons.append(f"{path} availability {summary['availability']:.2%}")
+            if summary['p95_ms'] is not None and summary['p95_ms'] > settings.get('degraded_latency_ms', 1000):
+                reasons.append(f"{path} p95 latency {summary['p95_ms']} ms")
+        if reasons and state != 'down':
+            state = 'degraded'
+
+        return {'state': state, 'reasons': reasons, 'window_seconds': window_seconds, **paths}
+
+    def get_summaries(self, service_names: Optional[List[str]] = None,
+                      window_seconds: int = 900) -> Dict[str, Optional[Dict]]:
+        if service_names is None:
+            with self._lock:
+                service_names = sorted({name for name, _ in self.last_results})
+        return {name: self.get_summary(name, window_seconds) for name in service_names}
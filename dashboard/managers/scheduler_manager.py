@@ -0,0 +1,173 @@
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .file_paths import file_paths
+from .config_manager import ConfigManager, write_json_atomic
+
+# Serializes read-modify-write cycles of scheduler.json, several managers share the file
+_state_lock = threading.Lock()
+
+# Suffix of the containers of every replica but the first, see AnsibleManager.replica_name
+REPLICA_SUFFIX = re.compile(r'-replica-\d+$')
+
+# Smoothing factor for recorded usage; higher values react faster to spikes
+USAGE_EWMA_ALPHA = 0.3
+
+
+class SchedulerManager:
+    """Capacity-aware placement of services onto nodes
+
+    Usage is recorded per service from container stats and kept in
+    scheduler.json together with the last placement of every service.
+    """
+
+    def __init__(self):
+        self.config_manager = ConfigManager()
+        self.state_path = file_paths['scheduler_json']
+
+    @staticmethod
+    def service_for_container(container_name: str) -> str:
+        return REPLICA_SUFFIX.sub('', container_name)
+
+    def _load_state(self) -> Dict:
+        if not os.path.exists(self.state_path):
+            return {'usage': {}, 'placements': {}}
+        with open(self.state_path) as f:
+            state = json.load(f)
+        state.setdefault('usage', {})
+        state.setdefault('placements', {})
+        return state
+
+    def _save_state(self, state: Dict) -> None:
+        write_json_atomic(self.state_path, state)
+
+    def record_usage(self, service_name: str, cpu_percent: float, memory_mb: float) -> None:
+        """Fold a stats sample into the recorded usage of a service
+
+        CPU is smoothed, memory keeps the peak since memory cannot be
+        overcommitted the way CPU can.
+        """
+        # Stats come per container, replicas share the usage of their service
+        service_name = self.service_for_container(service_name)
+        with _state_lock:
+            state = self._load_state()
+            usage = state['usage'].get(service_name)
+            if usage is None:
+                usage = {'cpu_percent': cpu_percent, 'memory_mb': memory_mb, 'samples': 0}
+            else:
+                usage['cpu_percent'] = USAGE_EWMA_ALPHA * cpu_percent + (1 - USAGE_EWMA_ALPHA) * usage['cpu_percent']
+                usage['memory_mb'] = max(usage['memory_mb'], memory_mb)
+            usage['samples'] += 1
+            usage['updated_at'] = datetime.now().isoformat()
+            state['usage'][service_name] = usage
+            self._save_state(state)
+
+    def get_service_demand(self, service_name: str, usage: Optional[Dict] = None) -> Dict[str, float]:
+        """Get the expected CPU (percent of one core) and memory (MB) of a service, all replicas included"""
+        scheduler_config = self.config_manager.get_scheduler_config()
+        replicas = self.config_manager.get_services_config().get(service_name, {}).get('replicas', 1)
+        if usage is None:
+            usage = self._load_state()['usage'].get(service_name)
+        if not usage:
+            usage = {
+                'cpu_percent': scheduler_config.get('default_cpu_percent', 10),
+                'memory_mb': scheduler_config.get('default_memory_mb', 128),
+            }
+        return {'cpu_percent': usage['cpu_percent'] * replicas, 'memory_mb': usage['memory_mb'] * replicas}
+
+    def place_services(self, service_names: List[str], current_nodes: Optional[Dict[str, str]] = None,
+                       persist: bool = True) -> Dict[str, str]:
+        """Assign each service to a node and return {service_name: node_name}
+
+        Services stay where they are pinned (services.<name>.node), where they
+        currently run or where they were last placed. Everything else is
+        placed largest demand first onto the node with the most headroom left.
+        Placements are only remembered when persist is set.
+        """
+        nodes = self.config_manager.get_nodes_config()
+        node_names = {node['name'] for node in nodes}
+        services_config = self.config_manager.get_services_config()
+        state = self._load_state()
+
+        # current_nodes maps container names, the first replica decides where a service runs
+        running = {}
+        for container_name, node_name in sorted((current_nodes or {}).items(), key=lambda c: c[0], reverse=True):
+            running[self.service_for_container(container_name)] = node_name
+        current_nodes = running
+
+        # Everything recorded as placed counts against node capacity, not only
+        # the services being deployed right now. Other containers are not services.
+        allocated = {node['name']: {'cpu_percent': 0.0, 'memory_mb': 0.0} for node in nodes}
+        known = {**state['placements'],
+                 **{name: node_name for name, node_name in current_nodes.items()
+                    if name in state['placements'] or name in services_config}}
+        for name, node_name in known.items():
+            if node_name in allocated and name not in service_names:
+                demand = self.get_service_demand(name, state['usage'].get(name))
+                allocated[node_name]['cpu_percent'] += demand['cpu_percent']
+                allocated[node_name]['memory_mb'] += demand['memory_mb']
+
+        placements = {}
+        unplaced = []
+        for name in service_names:
+            pinned = services_config.get(name, {}).get('node')
+            node_name = next((n for n in (pinned, current_nodes.get(name), state['placements'].get(name))
+                              if n in node_names), None)
+            if node_name:
+                placements[name] = node_name
+                demand = self.get_service_demand(name, state['usage'].get(name))
+                allocated[node_name]['cpu_percent'] += demand['cpu_percent']
+                allocated[node_name]['memory_mb'] += demand['memory_mb']
+            else:
+                unplaced.append(name)
+
+        demands = {name: self.get_service_demand(name, state['usage'].get(name)) for name in unplaced}
+        for name in sorted(unplaced, key=lambda n: (demands[n]['memory_mb'], demands[n]['cpu_percent']), reverse=True):
+            node = max(nodes, key=lambda n: self._headroom(n, allocated[n['name']], demands[name]))
+            placements[name] = node['name']
+            allocated[node['name']]['cpu_percent'] += demands[name]['cpu_percent']
+            allocated[node['name']]['memory_mb'] += demands[name]['memory_mb']
+
+        if persist:
+            with _state_lock:
+                # Re-read so usage recorded while placing is kept
+                state = self._load_state()
+                state['placements'].update(placements)
+                self._save_state(state)
+        return placements
+
+    @staticmethod
+    def _headroom(node: Dict, allocated: Dict[str, float], demand: Dict[str, float]) -> float:
+        """Fraction of the scarcer resource left on a node after adding demand
+
+        Nodes without declared capacity are treated as a single core with 1GB.
+        """
+        cpu_capacity = (node.get('cpus') or 1) * 100.0
+        memory_capacity = float(node.get('memory_mb') or 1024)
+        cpu_left = 1 - (allocated['cpu_percent'] + demand['cpu_percent']) / cpu_capacity
+        memory_left = 1 - (allocated['memory_mb'] + demand['memory_mb']) / memory_capacity
+        return min(cpu_left, memory_left)
+
+    def get_node_summary(self) -> List[Dict]:
+        """Get capacity and recorded allocation of every node"""
+        state = self._load_state()
+        summary = []
+        for node in self.config_manager.get_nodes_config():
+            services = sorted(name for name, node_name in state['placements'].items() if node_name == node['name'])
+            cpu = sum(self.get_service_demand(name, state['usage'].get(name))['cpu_percent'] for name in services)
+            memory = sum(self.get_service_demand(name, state['usage'].get(name))['memory_mb'] for name in services)
+            summary.append({
+                'name': node['name'],
+                'endpoint': node['endpoint'],
+                'ingress': node['ingress'],
+                'cpus': node['cpus'],
+                'memory_mb': node['memory_mb'],
+                'allocated_cpu_percent': round(cpu, 1),
+                'allocated_memory_mb': round(memory, 1),
+                'services': services,
+            })
+        return summary
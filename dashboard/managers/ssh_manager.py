@@ -1,12 +1,29 @@
 from .config_manager import ConfigManager
+import os
+import signal
 import subprocess
-from typing import Tuple
+from typing import Dict, Optional, Tuple
 
 
-def run_ssh_command(command: str) -> Tuple[bool, str, str]:
-    config_manager = ConfigManager()
-    ssh_host_config = config_manager.get_ssh_host_config()
-    ssh_cmd_prefix = f'cd .. && export SSHPASS={ssh_host_config.get('password')} && sshpass -e ssh -o StrictHostKeyChecking=no {ssh_host_config.get('username')}@{ssh_host_config.get('endpoint')}'
+def run_ssh_command(command: str, node: Optional[Dict] = None,
+                    timeout: Optional[float] = None) -> Tuple[bool, str, str]:
+    """Run a command on a node, defaulting to the ssh_host from config
+
+    With a timeout, connecting is limited to it as well and
+    subprocess.TimeoutExpired is raised once it passes.
+    """
+    ssh_host_config = node if node is not None else ConfigManager().get_ssh_host_config()
+    connect_timeout = f"-o ConnectTimeout={max(1, int(timeout))} " if timeout else ""
+    ssh_cmd_prefix = f"cd .. && export SSHPASS={ssh_host_config.get('password')} && sshpass -e ssh -o StrictHostKeyChecking=no {connect_timeout}{ssh_host_config.get('username')}@{ssh_host_config.get('endpoint')}"
     full_cmd = f'{ssh_cmd_prefix} "{command}"'
-    result = subprocess.run(full_cmd, shell=True, capture_output=True, text=True)
-    return result.returncode == 0, result.stdout, result.stderr
\ No newline at end of file
+    # A session of its own, so a timeout kills ssh and not just the shell running it
+    process = subprocess.Popen(full_cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                               start_new_session=True)
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.communicate()
+        # The full command line carries the password
+        raise subprocess.TimeoutExpired(command, timeout)
+    return process.returncode == 0, stdout, stderr
@@ -0,0 +1,170 @@
+import math
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from .config_manager import ConfigManager
+from .file_paths import file_paths
+from .periodic_worker import PeriodicWorker
+
+RAW_RETENTION_SECONDS = 3600
+ROLLUP_RETENTION_SECONDS = 7 * 24 * 3600
+ROLLUP_SECONDS = 60
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+class StatsHistoryManager:
+    """Keeps container CPU and memory history in a local round-robin SQLite store"""
+
+    def __init__(self, docker_manager, db_path: Optional[str] = None):
+        self.docker_manager = docker_manager
+        self.db_path = db_path or file_paths['stats_db']
+        self._lock = threading.Lock()
+        self._last_compacted = 0.0
+        self._worker = PeriodicWorker(
+            'stats-collector', self.collect,
+            lambda: ConfigManager().get_stats_history_config().get('interval_seconds', 30))
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _init_db(self) -> None:
+        with self._lock, self._connect() as db:
+            db.execute('''CREATE TABLE IF NOT EXISTS samples (
+                container TEXT NOT NULL, ts REAL NOT NULL, cpu_percent REAL NOT NULL, memory_mb REAL NOT NULL)''')
+            db.execute('CREATE INDEX IF NOT EXISTS samples_container_ts ON samples (container, ts)')
+            db.execute('''CREATE TABLE IF NOT EXISTS rollups (
+                container TEXT NOT NULL, minute INTEGER NOT NULL, samples INTEGER NOT NULL,
+                cpu_avg REAL NOT NULL, cpu_max REAL NOT NULL, memory_avg REAL NOT NULL, memory_max REAL NOT NULL,
+                PRIMARY KEY (container, minute))''')
+
+    def start(self) -> None:
+        """Start the background collector if it is enabled in config"""
+        if ConfigManager().get_stats_history_config().get('enabled', False):
+            self._worker.start()
+
+    def stop(self) -> None:
+        self._worker.stop()
+
+    def collect(self) -> int:
+        """Sample every running container once, returning the number of samples stored"""
+        names = [container.name for _, container in self.docker_manager.list_containers()
+                 if container.status == 'running']
+
+        def stats(name: str) -> Optional[Dict]:
+            try:
+                return self.docker_manager.get_container_stats(name)
+            except Exception:
+                return None
+
+        max_workers = ConfigManager().get_stats_history_config().get('max_concurrent_stats', 8)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(stats, names))
+
+        samples = [(name, result['cpu_percent'], result['memory_usage'])
+                   for name, result in zip(names, results) if result]
+        self.record_many(samples)
+        return len(samples)
+
+    def record(self, container: str, cpu_percent: float, memory_mb: float) -> None:
+        self.record_many([(container, cpu_percent, memory_mb)])
+
+    def record_many(self, samples: List[tuple]) -> None:
+        """Store (container, cpu_percent, memory_mb) samples taken now"""
+        now = time.time()
+        with self._lock, self._connect() as db:
+            db.executemany('INSERT INTO samples (container, ts, cpu_percent, memory_mb) VALUES (?, ?, ?, ?)',
+                           [(container, now, cpu, memory) for container, cpu, memory in samples])
+            if now - self._last_compacted >= ROLLUP_SECONDS:
+                self._compact(db, now)
+                self._last_compacted = now
+
+    @staticmethod
+    def _compact(db: sqlite3.Connection, now: float) -> None:
+        """Roll complete minutes up and drop data past its retention"""
+        current_minute = int(now // ROLLUP_SECONDS * ROLLUP_SECONDS)
+        # Recompute every complete minute still fully covered by raw samples, which is idempotent
+        first_minute = math.ceil((now - RAW_RETENTION_SECONDS) / ROLLUP_SECONDS) * ROLLUP_SECONDS
+        db.execute('''INSERT OR REPLACE INTO rollups
+            SELECT container, CAST(ts / ? AS INTEGER) * ? AS minute, COUNT(*),
+                   AVG(cpu_percent), MAX(cpu_percent), AVG(memory_mb), MAX(memory_mb)
+            FROM samples WHERE ts >= ? AND ts < ? GROUP BY container, minute''',
+                   (ROLLUP_SECONDS, ROLLUP_SECONDS, first_minute, current_minute))
+        db.execute('DELETE FROM samples WHERE ts < ?', (now - RAW_RETENTION_SECONDS,))
+        db.execute('DELETE FROM rollups WHERE minute < ?', (now - ROLLUP_RETENTION_SECONDS,))
+
+    @staticmethod
+    def _containers_of(service_name: str) -> str:
+        """Regex matching a service's primary and replica containers"""
+        return rf'^{re.escape(service_name)}(-replica-\d+)?$'
+
+    def _service_containers(self, db: sqlite3.Connection, table: str, service_name: str) -> List[str]:
+        pattern = re.compile(self._containers_of(service_name))
+        return [row[0] for row in db.execute(f'SELECT DISTINCT container FROM {table}') if pattern.match(row[0])]
+
+    def get_history(self, service_name: str, window_seconds: int = 3600) -> Dict:
+        """CPU and memory series of a service's containers, raw within the last hour and per minute beyond"""
+        since = time.time() - window_seconds
+        with self._lock, self._connect() as db:
+            if window_seconds <= RAW_RETENTION_SECONDS:
+                resolution = 'raw'
+                containers = self._service_containers(db, 'samples', service_name)
+                rows = db.execute(f'''SELECT container, ts, cpu_percent, memory_mb FROM samples
+                    WHERE ts >= ? AND container IN ({','.join('?' * len(containers))}) ORDER BY ts''',
+                                  (since, *containers)).fetchall()
+            else:
+                resolution = 'minute'
+                containers = self._service_containers(db, 'rollups', service_name)
+                rows = db.execute(f'''SELECT container, minute, cpu_avg, memory_max FROM rollups
+                    WHERE minute >= ? AND container IN ({','.join('?' * len(containers))}) ORDER BY minute''',
+                                  (since, *containers)).fetchall()
+
+        series: Dict[str, List[Dict]] = {}
+        for container, ts, cpu, memory in rows:
+            series.setdefault(container, []).append(
+                {'ts': ts, 'cpu_percent': round(cpu, 2), 'memory_mb': round(memory, 2)})
+        return {'service': service_name, 'window_seconds': window_seconds, 'resolution': resolution,
+                'containers': series}
+
+    def recommend_limits(self, service_name: str, min_minutes: int = 60) -> Dict:
+        """Recommend cpus and mem_limit for a service from p95 usage of its containers
+
+        CPU gets twice its p95 per-minute average, as a CPU limit throttles
+        rather than kills. Memory gets the larger of 1.5x the p95 per-minute
+        peak and 1.2x the highest peak seen, as going over it gets the
+        container killed.
+        """
+        with self._lock, self._connect() as db:
+            containers = self._service_containers(db, 'rollups', service_name)
+            rows = db.execute(f'''SELECT minute, cpu_avg, memory_max FROM rollups
+                WHERE container IN ({','.join('?' * len(containers))})''', containers).fetchall()
+
+        minutes = len({row[0] for row in rows})
+        result = {'service': service_name, 'minutes_observed': minutes}
+        if minutes < min_minutes:
+            result['reason'] = f'Need at least {min_minutes} minutes of history, have {minutes}'
+            return result
+
+        # Limits apply per container, so every replica's minutes count as observations
+        cpu_p95 = _percentile([row[1] for row in rows], 0.95)
+        memory_p95 = _percentile([row[2] for row in rows], 0.95)
+        memory_peak = max(row[2] for row in rows)
+        cpus = max(0.1, math.ceil(cpu_p95 / 100 * 2 * 20) / 20)
+        memory_mb = max(64, math.ceil(max(memory_p95 * 1.5, memory_peak * 1.2) / 16) * 16)
+        result.update({
+            'cpu_p95_percent': round(cpu_p95, 2),
+            'memory_p95_mb': round(memory_p95, 2),
+            'memory_peak_mb': round(memory_peak, 2),
+            'recommended': {'cpus': cpus, 'mem_limit': f'{memory_mb}m'},
+        })
+        return result